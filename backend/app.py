@@ -1,13 +1,31 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
+import contextlib
+import functools
 import os
-import traceback
+import json
+import threading
+import numpy as np
 from flask_cors import CORS
 from dotenv import load_dotenv
-from calculator import EnergyCalculator
+from calculator import DYNAMIC_FILE, FIXED_FILE, PRICES_FILE, EnergyCalculator, dataset_version
+from contracts import load_catalog
+from dynamic_pricing import load_dynamic_contracts, load_price_store
+from dataset_cache import DatasetCache
+import metrics
+from responses import FastJSONProvider, compress, is_not_modified, make_etag
+from tariffs import get_tariff_calendar
+from battery import DEFAULT_FEED_IN_PRICE, DEFAULT_FIXED_PRICE
+
+try:
+    import fcntl
+except ImportError:  # Windows: alleen de thread-lock
+    fcntl = None
 
 load_dotenv()
 
 app = Flask(__name__)
+# orjson-serialisatie (met NumPy-ondersteuning); `jsonify` wordt als stage gemeten
+app.json = FastJSONProvider(app)
 
 CORS(app, resources={
     r"/api/*": {
@@ -17,9 +35,88 @@ CORS(app, resources={
     }
 })
 
-DATA_FILE = os.path.join(os.path.dirname(__file__), 'uploads', 'real_data.json')
+DATA_FILE = os.getenv('ENERGY_DATA_FILE', os.path.join(os.path.dirname(__file__), 'uploads', 'real_data.json'))
+
+# Gedeelde cache van geshapete datasets; invalideert zelf zodra het bestand wijzigt
+DATASET_CACHE = DatasetCache(max_bytes=int(os.getenv('DATASET_CACHE_MB', '256')) * 1024 * 1024)
+
+# Uploads worden na elkaar verwerkt zodat het append-log consistent blijft
+UPLOAD_LOCK = threading.Lock()
+
+@contextlib.contextmanager
+def upload_lock():
+    """Serialiseert uploads binnen dit proces én tussen workers (flock op een lockbestand)."""
+    with UPLOAD_LOCK:
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(DATA_FILE), exist_ok=True)
+        with open(f"{DATA_FILE}.lock", 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+# Normaal/dal-venster van de netbeheerder (standaard ma-vr 07:00-23:00)
+TARIFF_CALENDAR = get_tariff_calendar(os.getenv('NETBEHEERDER'))
+
+def preload_datasets():
+    """Laadt referentiedata en de meterdataset (store + rollups) in de gedeelde caches.
+
+    Bedoeld voor de master van een pre-forking server (zie wsgi.py): wat hier geladen
+    wordt, delen de workers copy-on-write in plaats van het elk zelf te parsen.
+    """
+    loaded = []
+    for path, loader in ((FIXED_FILE, load_catalog), (PRICES_FILE, load_price_store),
+                         (DYNAMIC_FILE, load_dynamic_contracts)):
+        if os.path.exists(path):
+            loader(path)
+            loaded.append(os.path.basename(path))
+    if os.path.exists(DATA_FILE):
+        calc = EnergyCalculator(DATA_FILE, cache=DATASET_CACHE, tariff_calendar=TARIFF_CALENDAR)
+        calc.rollups  # bouwt de rollups en zet ze in de cache
+        loaded.append(os.path.basename(DATA_FILE))
+    return loaded
+
+@app.before_request
+def start_timing():
+    metrics.start_request()
+
+@app.after_request
+def add_server_timing(response):
+    # Duur per route en per calculator-stage; alleen actief met METRICS_ENABLED=1
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    timings = metrics.end_request(route, failed=response.status_code >= 500)
+    if timings:
+        response.headers['Server-Timing'] = metrics.server_timing_header(timings)
+    return response
+
+@app.after_request
+def compress_response(response):
+    # Draait vóór add_server_timing, zodat de compressie in de timing meetelt
+    return compress(response, request.accept_encodings)
+
+def conditional(view):
+    """ETag uit datasetversie + request; bij een match volgt een 304 zonder data te laden."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not os.path.exists(DATA_FILE):
+            return view(*args, **kwargs)
+        etag = make_etag(dataset_version(DATA_FILE), TARIFF_CALENDAR.key, request.path,
+                         sorted(request.args.items(multi=True)))
+        if is_not_modified(request, etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+        response = app.make_response(view(*args, **kwargs))
+        if response.status_code == 200:
+            response.set_etag(etag)
+        return response
+    return wrapper
 
 @app.route('/api/load-local-data', methods=['GET'])
+@conditional
 def load_local_data():
     try:
         if not os.path.exists(DATA_FILE):
@@ -32,56 +129,196 @@ def load_local_data():
         manual_hoog = request.args.get('hoog', type=float, default=None)
         manual_laag = request.args.get('laag', type=float, default=None)
 
-        calc = EnergyCalculator(DATA_FILE)
+        calc = EnergyCalculator(DATA_FILE, cache=DATASET_CACHE, tariff_calendar=TARIFF_CALENDAR)
         response_data = calc.get_full_analysis_json(manual_hoog=manual_hoog, manual_laag=manual_laag)
         return jsonify(response_data), 200
 
     except Exception as e:
-        print(f"[ERROR] load_local_data: {traceback.format_exc()}")
+        app.logger.exception('load_local_data mislukt')
         return jsonify({'success': False, 'error': str(e)}), 500
     
+@app.route('/api/upload-readings', methods=['POST'])
+def upload_readings():
+    """Voegt een nieuwe energyassetbundles-chunk toe (JSON-body of bestand in veld 'file')."""
+    try:
+        if 'file' in request.files:
+            payload = json.load(request.files['file'])
+        else:
+            payload = request.get_json(silent=True)
+        if not isinstance(payload, dict) or not isinstance(payload.get('energyassetbundles'), list):
+            return jsonify({'success': False, 'error': "Verwacht een object met 'energyassetbundles'"}), 400
+
+        with upload_lock():
+            if not os.path.exists(DATA_FILE):
+                os.makedirs(os.path.dirname(DATA_FILE), exist_ok=True)
+                with open(DATA_FILE, 'w') as f:
+                    json.dump({'energyassetbundles': []}, f)
+
+            calc = EnergyCalculator(DATA_FILE, cache=DATASET_CACHE, tariff_calendar=TARIFF_CALENDAR)
+            result = calc.append_readings(payload['energyassetbundles'])
+
+        return jsonify({'success': True, **result, 'summary': calc.get_summary()}), 200
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        app.logger.exception('upload_readings mislukt')
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/month-detail/<int:month>', methods=['GET'])
+@conditional
 def get_month_detail(month):
     try:
         if not os.path.exists(DATA_FILE):
             return jsonify({'error': 'Data niet gevonden'}), 404
             
-        calc = EnergyCalculator(DATA_FILE)
+        year = request.args.get('year', type=int, default=None)
+        calc = EnergyCalculator(DATA_FILE, cache=DATASET_CACHE, tariff_calendar=TARIFF_CALENDAR)
         # Gebruik de methode uit de calculator, die regelt de logica voor JSON/Index
-        data = calc.get_daily_usage_for_month(month)
+        data = calc.get_daily_usage_for_month(month, year)
         
         return jsonify(data), 200
     except Exception as e:
-        print(f"[ERROR] month-detail: {traceback.format_exc()}")
+        app.logger.exception('month-detail mislukt')
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/hourly-detail/<int:month>', methods=['GET'])
+@conditional
 def get_hourly_detail(month):
-    calc = EnergyCalculator(DATA_FILE)
-    df = calc.df[calc.df.index.month == month]
-    
-    hourly_stats = df.groupby(df.index.hour).agg({
-        'consumption_interval': 'mean',
-        'return_interval': 'mean'
-    }).reset_index()
-    
-    hourly_stats.columns = ['hour', 'verbruik', 'teruglevering']
-    return jsonify(hourly_stats.to_dict(orient='records'))
+    year = request.args.get('year', type=int, default=None)
+    calc = EnergyCalculator(DATA_FILE, cache=DATASET_CACHE, tariff_calendar=TARIFF_CALENDAR)
+    return jsonify(calc.get_hourly_for_month(month, year))
+
+@app.route('/api/usage', methods=['GET'])
+@conditional
+def get_usage():
+    try:
+        if not os.path.exists(DATA_FILE):
+            return jsonify({'error': 'Data niet gevonden'}), 404
+
+        start = request.args.get('start')
+        end = request.args.get('end')
+        resolution = request.args.get('resolution')
+
+        calc = EnergyCalculator(DATA_FILE, cache=DATASET_CACHE, tariff_calendar=TARIFF_CALENDAR)
+        data, resolution = calc.get_usage(start, end, resolution)
+        return jsonify({'start': start, 'end': end, 'resolution': resolution, 'data': data}), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        app.logger.exception('usage mislukt')
+        return jsonify({'error': str(e)}), 500
 
 @app.route('/api/compare-contracts', methods=['GET'])
+@conditional
 def compare_contracts():
     try:
         if not os.path.exists(DATA_FILE):
             return jsonify({'error': 'Geen data gevonden'}), 404
 
-        calc = EnergyCalculator(DATA_FILE)
+        calc = EnergyCalculator(DATA_FILE, cache=DATASET_CACHE, tariff_calendar=TARIFF_CALENDAR)
         results = calc.calculate()
         sorted_results = sorted(results, key=lambda x: x.get('yearlyCost', 0))
         
         return jsonify(sorted_results), 200
     except Exception as e:
-        print(f"[ERROR] compare_contracts: {traceback.format_exc()}")
+        app.logger.exception('compare_contracts mislukt')
+        return jsonify({'error': str(e)}), 500
+@app.route('/api/compare-dynamic', methods=['GET'])
+@conditional
+def compare_dynamic():
+    try:
+        if not os.path.exists(DATA_FILE):
+            return jsonify({'error': 'Geen data gevonden'}), 404
+
+        manual_hoog = request.args.get('hoog', type=float, default=None)
+        manual_laag = request.args.get('laag', type=float, default=None)
+
+        calc = EnergyCalculator(DATA_FILE, cache=DATASET_CACHE, tariff_calendar=TARIFF_CALENDAR)
+        results = calc.calculate_dynamic(manual_hoog, manual_laag)
+        return jsonify(sorted(results, key=lambda x: x.get('yearlyCost', 0))), 200
+    except Exception as e:
+        app.logger.exception('compare_dynamic mislukt')
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/compare-scenarios', methods=['POST'])
+def compare_scenarios():
+    """Rangschikt alle contracten voor een reeks what-if scenario's (hoog/laag/teruglevering)."""
+    try:
+        if not os.path.exists(DATA_FILE):
+            return jsonify({'error': 'Geen data gevonden'}), 404
+
+        body = request.get_json(silent=True) or {}
+        scenarios = body.get('scenarios') or []
+        if not scenarios:
+            return jsonify({'error': 'Geen scenario\'s opgegeven'}), 400
+        top = body.get('top')
+
+        calc = EnergyCalculator(DATA_FILE, cache=DATASET_CACHE, tariff_calendar=TARIFF_CALENDAR)
+        if calc.store.empty or not os.path.exists(calc.fixed_path):
+            return jsonify([]), 200
+        _, est_return, _ = calc.estimate_yearly()
+
+        hoog = np.array([float(s.get('hoog', 0)) for s in scenarios])
+        laag = np.array([float(s.get('laag', 0)) for s in scenarios])
+        returned = np.array([float(s.get('teruglevering', est_return)) for s in scenarios])
+        usage = hoog + laag
+        share_normaal = np.divide(hoog, usage, out=np.zeros_like(usage), where=usage > 0)
+
+        comparison = calc.compare_scenarios(usage, returned, share_normaal)
+        return jsonify([{
+            'scenario': dict(scenario),
+            'results': comparison.ranked(i, top)
+        } for i, scenario in enumerate(scenarios)]), 200
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        app.logger.exception('compare_scenarios mislukt')
         return jsonify({'error': str(e)}), 500
+
+# Standaard-sweep in kWh en het maximum aantal configuraties per request
+BATTERY_CAPACITIES = '2.5,5,7.5,10,12.5,15,20'
+MAX_BATTERY_CONFIGS = 64
+
+@app.route('/api/battery-sweep', methods=['GET'])
+@conditional
+def battery_sweep():
+    """Jaarlijkse besparing van een thuisbatterij voor een reeks capaciteiten, vast en dynamisch."""
+    try:
+        if not os.path.exists(DATA_FILE):
+            return jsonify({'error': 'Geen data gevonden'}), 404
+
+        capacities = [float(c) for c in request.args.get('capacities', BATTERY_CAPACITIES).split(',') if c.strip()]
+        if not capacities or len(capacities) > MAX_BATTERY_CONFIGS:
+            return jsonify({'error': f'Geef 1 tot {MAX_BATTERY_CONFIGS} capaciteiten op'}), 400
+        strategy = request.args.get('strategy', 'self_consumption')
+        saldering = request.args.get('saldering', '1').lower() not in ('0', 'false', 'no')
+
+        calc = EnergyCalculator(DATA_FILE, cache=DATASET_CACHE, tariff_calendar=TARIFF_CALENDAR)
+        results = calc.simulate_battery(
+            capacities,
+            power_kw=request.args.get('power', type=float, default=None),
+            efficiency=request.args.get('efficiency', type=float, default=0.9),
+            strategy=strategy,
+            fixed_price=request.args.get('fixed_price', type=float, default=DEFAULT_FIXED_PRICE),
+            feed_in_price=request.args.get('feed_in', type=float, default=DEFAULT_FEED_IN_PRICE),
+            saldering=saldering
+        )
+        return jsonify({'strategy': strategy, 'saldering': saldering, 'results': results}), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        app.logger.exception('battery_sweep mislukt')
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/cache-stats', methods=['GET'])
+def cache_stats():
+    return jsonify(DATASET_CACHE.stats()), 200
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Stage- en route-metrics in Prometheus-tekstformaat."""
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
 # --- STATUS & LEGACY TRAPS ---
 
 @app.route('/', methods=['GET'])
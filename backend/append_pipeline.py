@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from interval_store import IntervalStore
+
+
+def merge_intervals(df, chunk):
+    """Voegt nieuwe intervallen samen met de bestaande reeks; bij overlap wint `chunk`.
+
+    Geeft het samengevoegde frame terug plus de bestaande rijen die vervangen zijn,
+    zodat afgeleide aggregaten die er eerst af kunnen halen. Een chunk die volledig
+    na de bestaande data ligt (de gewone dagelijkse sync) wordt alleen achteraan
+    geplakt, zonder sorteren of zoeken in de historie.
+    """
+    chunk = chunk[~chunk.index.duplicated(keep='last')].sort_index()
+    if df.empty:
+        return chunk, chunk.iloc[0:0]
+    if chunk.empty:
+        return df, df.iloc[0:0]
+
+    if chunk.index[0] > df.index[-1]:
+        return pd.concat([df, chunk]), df.iloc[0:0]
+
+    # Alleen het deel van de historie vanaf de eerste nieuwe tijdstempel kan overlappen
+    start = df.index.searchsorted(chunk.index[0], side='left')
+    tail = df.iloc[start:]
+    overlap = tail.index.isin(chunk.index)
+    replaced = tail[overlap]
+    merged = pd.concat([df.iloc[:start], pd.concat([tail[~overlap], chunk]).sort_index(kind='stable')])
+    return merged, replaced
+
+
+def merge_stores(store, chunk):
+    """Als `merge_intervals`, maar direct op de kolommen van twee IntervalStores.
+
+    `chunk` heeft unieke tijdstempels (zoals na `shape_records`) en eigen tarieflabels.
+    Een chunk na het einde van de reeks wordt alleen achter de kolommen geplakt;
+    anders wordt alleen de staart vanaf de eerste nieuwe tijdstempel opnieuw
+    gesorteerd. Geeft de nieuwe store en de vervangen intervallen.
+    """
+    if len(chunk) > 1 and np.any(chunk.ts[1:] < chunk.ts[:-1]):
+        chunk = chunk.take(np.argsort(chunk.ts, kind='stable'))
+    if store.empty:
+        return chunk, store
+    if chunk.empty:
+        return store, chunk
+
+    if chunk.ts[0] > store.ts[-1]:
+        return IntervalStore.concat([store, chunk]), store.slice(0, 0)
+
+    start = store.searchsorted(chunk.ts[0])
+    tail = store.slice(start, len(store))
+    overlap = np.isin(tail.ts, chunk.ts)
+    merged_tail = IntervalStore.concat([tail.take(~overlap), chunk])
+    merged_tail = merged_tail.take(np.argsort(merged_tail.ts, kind='stable'))
+    return IntervalStore.concat([store.slice(0, start), merged_tail]), tail.take(overlap)
@@ -0,0 +1,245 @@
+"""Batchvergelijking van contracten voor veel huishoudens tegelijk.
+
+Gebruik:
+    python batch.py uploads/klanten/ -o resultaten.parquet --workers 8
+    python batch.py manifest.csv -o resultaten.csv
+
+De invoer is een map met `*.json` meterexports of een manifest (één pad per
+regel, of een CSV met een kolom `path` en optioneel `household`). Contract-
+catalogus en prijsdata worden één keer in het hoofdproces geladen en via fork
+read-only gedeeld met de workers. Resultaten worden per batch weggeschreven;
+een bestand dat faalt levert een rij met `error` op en stopt de run niet.
+"""
+import argparse
+import csv
+import glob
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+from calculator import EnergyCalculator
+from contracts import load_catalog
+from dynamic_pricing import load_dynamic_contracts, load_price_store
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+COLUMNS = [
+    'household', 'path', 'intervals', 'est_usage_kwh', 'est_return_kwh', 'share_normaal',
+    'best_provider', 'best_contract', 'best_yearly_cost', 'median_yearly_cost', 'savings_vs_median',
+    'best_dynamic_provider', 'best_dynamic_yearly_cost', 'seconds', 'error'
+]
+WRITE_BATCH = 256
+
+# Gedeelde, read-only referentiedata per proces (bij fork geërfd van het hoofdproces)
+_paths = {}
+
+
+def read_inputs(source):
+    """Lijst van (household, pad) uit een map of manifest."""
+    if os.path.isdir(source):
+        files = sorted(glob.glob(os.path.join(source, '*.json')))
+        return [(os.path.splitext(os.path.basename(f))[0], f) for f in files]
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, newline='') as f:
+        first = f.readline()
+        f.seek(0)
+        if 'path' in [c.strip() for c in first.split(',')]:
+            rows = [(r.get('household') or '', r['path']) for r in csv.DictReader(f)]
+        else:
+            rows = [('', line.strip()) for line in f if line.strip() and not line.startswith('#')]
+
+    inputs = []
+    for household, path in rows:
+        path = path if os.path.isabs(path) else os.path.join(base, path)
+        inputs.append((household or os.path.splitext(os.path.basename(path))[0], path))
+    return inputs
+
+
+def _init_worker(fixed_path, prices_path, dynamic_path):
+    _paths.update(fixed=fixed_path, prices=prices_path, dynamic=dynamic_path)
+    # No-op na fork (al in cache); bij spawn wordt de referentiedata hier één keer per worker geladen
+    _load_reference_data()
+
+
+def _load_reference_data():
+    if _paths.get('fixed') and os.path.exists(_paths['fixed']):
+        load_catalog(_paths['fixed'])
+    if _paths.get('prices') and os.path.exists(_paths['prices']):
+        load_price_store(_paths['prices'])
+    if _paths.get('dynamic') and os.path.exists(_paths['dynamic']):
+        load_dynamic_contracts(_paths['dynamic'])
+
+
+def compare_household(item):
+    """Ingest + contractvergelijking voor één meterexport; fouten worden als rij teruggegeven."""
+    household, path = item
+    row = dict.fromkeys(COLUMNS)
+    row.update(household=household, path=path)
+    start = time.perf_counter()
+    try:
+        calc = EnergyCalculator(path, use_ingest_cache=False)
+        if _paths.get('fixed'):
+            calc.fixed_path = _paths['fixed']
+        if _paths.get('prices'):
+            calc.prices_path = _paths['prices']
+        if _paths.get('dynamic'):
+            calc.dynamic_path = _paths['dynamic']
+
+        row['intervals'] = len(calc.store)
+        if calc.store.empty:
+            raise ValueError('Geen verbruiksdata in bestand')
+
+        usage, returned, share_normaal = calc.estimate_yearly()
+        row.update(est_usage_kwh=round(usage, 1), est_return_kwh=round(returned, 1),
+                   share_normaal=round(share_normaal, 4))
+
+        if os.path.exists(calc.fixed_path):
+            comparison = calc.compare_scenarios(usage, returned, share_normaal)
+            yearly = comparison.yearly[0]
+            best = comparison.best()[0]
+            median = float(np.median(yearly))
+            row.update(
+                best_provider=comparison.catalog.providers[best],
+                best_contract=comparison.catalog.contracts[best],
+                best_yearly_cost=round(float(yearly[best]), 2),
+                median_yearly_cost=round(median, 2),
+                savings_vs_median=round(median - float(yearly[best]), 2)
+            )
+
+        dynamic = calc.calculate_dynamic()
+        if dynamic:
+            best_dynamic = min(dynamic, key=lambda r: r['yearlyCost'])
+            row.update(best_dynamic_provider=best_dynamic['provider'],
+                       best_dynamic_yearly_cost=best_dynamic['yearlyCost'])
+    except Exception as e:
+        row['error'] = f"{type(e).__name__}: {e}"
+    row['seconds'] = round(time.perf_counter() - start, 4)
+    return row
+
+
+class _ResultWriter:
+    """Schrijft rijen in batches weg als Parquet (indien pyarrow beschikbaar) of CSV."""
+
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.use_parquet = output_path.endswith('.parquet')
+        if self.use_parquet and pq is None:
+            raise RuntimeError('Parquet-uitvoer vereist pyarrow (pip install pyarrow); gebruik anders .csv')
+        self._buffer = []
+        self._writer = None
+        self._csv_file = None
+        self.rows = 0
+        self.errors = 0
+
+    def write(self, row):
+        self._buffer.append(row)
+        self.rows += 1
+        self.errors += row['error'] is not None
+        if len(self._buffer) >= WRITE_BATCH:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        if self.use_parquet:
+            table = pa.Table.from_pylist(self._buffer, schema=self._schema())
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.output_path, table.schema)
+            self._writer.write_table(table)
+        else:
+            if self._csv_file is None:
+                self._csv_file = open(self.output_path, 'w', newline='')
+                self._writer = csv.DictWriter(self._csv_file, fieldnames=COLUMNS)
+                self._writer.writeheader()
+            self._writer.writerows(self._buffer)
+            self._csv_file.flush()
+        self._buffer = []
+
+    @staticmethod
+    def _schema():
+        strings = {'household', 'path', 'best_provider', 'best_contract', 'best_dynamic_provider', 'error'}
+        return pa.schema([(c, pa.string() if c in strings else pa.int64() if c == 'intervals' else pa.float64())
+                          for c in COLUMNS])
+
+    def close(self):
+        self.flush()
+        if self.use_parquet and self._writer is not None:
+            self._writer.close()
+        if self._csv_file is not None:
+            self._csv_file.close()
+
+
+def run_batch(inputs, output_path, workers=None, fixed_path=None, prices_path=None, dynamic_path=None,
+              progress=None):
+    """Vergelijkt alle huishoudens in `inputs` over een process pool en streamt de resultaten weg.
+
+    `inputs` is een lijst van (household, pad). Zonder expliciete paden worden
+    de standaardlocaties van `EnergyCalculator` gebruikt.
+    """
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    init_args = (
+        fixed_path or os.path.join(current_dir, 'data', 'vast_contract_energie.csv'),
+        prices_path or os.path.join(current_dir, 'data', 'Netherlands.csv'),
+        dynamic_path or os.path.join(current_dir, 'data', 'dynamic_contracts.csv'),
+    )
+
+    # Laad de referentiedata vóór het forken, zodat workers dezelfde pagina's delen
+    _init_worker(*init_args)
+
+    writer = _ResultWriter(output_path)
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, min(16, len(inputs) // (workers * 4) or 1))
+    try:
+        if workers == 1:
+            results = map(compare_household, inputs)
+            for row in results:
+                writer.write(row)
+                if progress: progress(writer.rows, len(inputs))
+        else:
+            with multiprocessing.Pool(workers, initializer=_init_worker, initargs=init_args) as pool:
+                for row in pool.imap_unordered(compare_household, inputs, chunksize=chunksize):
+                    writer.write(row)
+                    if progress: progress(writer.rows, len(inputs))
+    finally:
+        writer.close()
+    return {'rows': writer.rows, 'errors': writer.errors, 'output': output_path}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Batchvergelijking van energiecontracten voor veel huishoudens.')
+    parser.add_argument('source', help='Map met *.json meterexports of een manifest')
+    parser.add_argument('-o', '--output', required=True, help='Uitvoerbestand (.parquet of .csv)')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='Aantal processen (standaard: aantal cores)')
+    parser.add_argument('--contracts', help='Contractcatalogus (CSV)')
+    parser.add_argument('--prices', help='EPEX-prijzen (CSV)')
+    parser.add_argument('--dynamic', help='Dynamische contracten (CSV)')
+    args = parser.parse_args(argv)
+
+    inputs = read_inputs(args.source)
+    if not inputs:
+        print(f"Geen meterexports gevonden in {args.source}", file=sys.stderr)
+        return 1
+
+    start = time.perf_counter()
+    try:
+        summary = run_batch(inputs, args.output, workers=args.workers, fixed_path=args.contracts,
+                            prices_path=args.prices, dynamic_path=args.dynamic)
+    except RuntimeError as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+    print(f"{summary['rows']} huishoudens in {elapsed:.1f} s ({summary['rows'] / elapsed:.1f}/s), "
+          f"{summary['errors']} fouten -> {summary['output']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
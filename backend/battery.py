@@ -0,0 +1,205 @@
+"""Simulatie van een thuisbatterij op de eigen kwartierdata, voor veel batterijgroottes tegelijk.
+
+Alle configuraties (capaciteit, vermogen) lopen als kolommen van één (T, K)-array
+door de simulatie. Alleen de laadtoestand is sequentieel in de tijd; per stap is
+dat één bewerking over alle configuraties. Laden en ontladen worden per interval
+eerst zonder capaciteitsgrens bepaald en daarna gecorrigeerd voor wat de batterij
+werkelijk kon opnemen of leveren.
+"""
+import numpy as np
+
+from dynamic_pricing import BTW
+
+INTERVAL_H = 0.25
+STRATEGIES = ('self_consumption', 'arbitrage')
+
+# Standaardtarieven voor de vergelijking (EUR/kWh incl. BTW, excl. energiebelasting)
+DEFAULT_FIXED_PRICE = 0.25
+DEFAULT_FEED_IN_PRICE = 0.05
+# Inkoopopslag voor dynamisch (excl. BTW) als er geen dynamische contracten bekend zijn
+DEFAULT_OPSLAG = 0.02
+# Vermogen als fractie van de capaciteit als het niet is opgegeven (0.5C)
+DEFAULT_C_RATE = 0.5
+# Maximaal aantal (interval × configuratie)-cellen per blok; begrenst het geheugen van een sweep
+BLOCK_CELLS = 4_000_000
+
+
+def _state_of_charge(delta, capacity):
+    """soc_t = clip(soc_{t-1} + delta_t, 0, capacity) voor alle configuraties tegelijk."""
+    soc = np.empty_like(delta)
+    previous = np.zeros(delta.shape[1])
+    # Losse ufuncs met out= in de rij van soc; np.clip heeft per aanroep merkbare overhead
+    for t in range(len(delta)):
+        level = soc[t]
+        np.add(previous, delta[t], out=level)
+        np.maximum(level, 0.0, out=level)
+        np.minimum(level, capacity, out=level)
+        previous = level
+    return soc
+
+
+def _price_windows(price, day, intervals_to_fill, efficiency):
+    """Per dag de goedkoopste intervallen om te laden en de duurste om te ontladen, per configuratie.
+
+    Het venster is zo lang als nodig om de batterij vol te laden. Er wordt alleen
+    gehandeld in intervallen waar de spread met de andere kant van de dag de
+    rendementsverliezen terugverdient.
+    """
+    n = len(price)
+    valid = ~np.isnan(price)
+    order = np.lexsort((np.where(valid, price, np.inf), day))
+    day_sorted = day[order]
+    starts = np.r_[0, np.flatnonzero(day_sorted[1:] != day_sorted[:-1]) + 1]
+    counts = np.diff(np.r_[starts, n])
+
+    rank = np.empty(n, dtype='int64')
+    rank[order] = np.arange(n) - np.repeat(starts, counts)
+    priced_per_day = np.bincount(np.repeat(np.arange(len(starts)), counts), weights=valid[order])
+    size = np.empty(n, dtype='int64')
+    size[order] = np.repeat(priced_per_day.astype('int64'), counts)
+
+    sorted_price = np.where(valid, price, np.nan)[order]
+    day_min = np.repeat(np.fmin.reduceat(sorted_price, starts), counts)
+    day_max = np.repeat(np.fmax.reduceat(sorted_price, starts), counts)
+    low = np.empty(n)
+    high = np.empty(n)
+    low[order], high[order] = day_min, day_max
+
+    window = intervals_to_fill[None, :]
+    cheap = (rank[:, None] < window) & (price < high * efficiency)[:, None]
+    expensive = (rank[:, None] >= size[:, None] - window) & (price * efficiency > low)[:, None]
+    cheap &= valid[:, None]
+    expensive &= valid[:, None] & ~cheap
+    return cheap, expensive
+
+
+def simulate_batteries(consumption, returned, capacity_kwh, power_kw, efficiency=0.9,
+                       strategy='self_consumption', price=None, day=None, interval_h=INTERVAL_H):
+    """Simuleert K batterijen over T intervallen.
+
+    `consumption` en `returned` zijn kWh per interval (netto afname en teruglevering
+    van de meter). `capacity_kwh` en `power_kw` hebben lengte K; `efficiency` is het
+    rondgaand rendement. Bij `self_consumption` laadt de batterij alleen met
+    teruglevering en ontlaadt hij naar het eigen verbruik. Bij `arbitrage` laadt hij
+    daarnaast uit het net in de goedkoopste intervallen van de dag en levert hij
+    terug in de duurste; daarvoor zijn `price` (EUR/kWh per interval, NaN = onbekend)
+    en `day` (dagsleutel per interval) nodig. `interval_h` is de lengte van een
+    interval in uur en begrenst samen met `power_kw` de energie per interval.
+
+    Geeft een dict met (T, K)-arrays `import`, `export`, `soc` en per configuratie
+    de totalen `charged`, `discharged` (kWh aan de batterijklemmen) en
+    `self_consumed` (naar het eigen verbruik ontladen).
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Onbekende strategie '{strategy}', kies uit {', '.join(STRATEGIES)}")
+    if not 0 < efficiency <= 1:
+        raise ValueError("Rendement moet tussen 0 en 1 liggen")
+    if np.any(np.asarray(capacity_kwh) < 0) or np.any(np.asarray(power_kw) < 0):
+        raise ValueError("Capaciteit en vermogen mogen niet negatief zijn")
+    cons = np.asarray(consumption, dtype='float64')[:, None]
+    ret = np.asarray(returned, dtype='float64')[:, None]
+    capacity = np.asarray(capacity_kwh, dtype='float64')
+    max_e = np.asarray(power_kw, dtype='float64')[None, :] * interval_h
+    eta = np.sqrt(efficiency)
+
+    # Afname en teruglevering binnen hetzelfde kwartier eerst tegen elkaar wegstrepen: alleen
+    # het netto overschot laadt en alleen het netto tekort ontlaadt, anders pendelt energie
+    # binnen één interval door de batterij en worden cycli en verliezen overschat
+    charge = np.minimum(np.maximum(ret - cons, 0.0), max_e)
+    discharge = np.minimum(np.maximum(cons - ret, 0.0), max_e)
+    grid_charge = np.zeros_like(charge)
+    grid_discharge = np.zeros_like(charge)
+    if strategy == 'arbitrage':
+        if price is None or day is None:
+            raise ValueError("Strategie 'arbitrage' vereist prijzen per interval")
+        price = np.asarray(price, dtype='float64')
+        intervals_to_fill = np.ceil(np.divide(capacity, eta * max_e[0], out=np.zeros_like(capacity),
+                                              where=max_e[0] > 0))
+        cheap, expensive = _price_windows(price, np.asarray(day), intervals_to_fill, efficiency)
+        grid_charge = np.where(cheap, max_e - charge, 0.0)
+        grid_discharge = np.where(expensive, max_e - discharge, 0.0)
+        # In de goedkope uren wordt het verbruik uit het net gehaald, niet uit de batterij
+        discharge = np.where(cheap, 0.0, discharge)
+
+    desired = eta * (charge + grid_charge) - (discharge + grid_discharge) / eta
+    soc = _state_of_charge(desired, capacity)
+    realized = np.diff(soc, axis=0, prepend=0.0)
+
+    # Wat de batterij niet kon opnemen (vol) of leveren (leeg) gaat eerst van de nethandel af
+    short_in = np.maximum(desired - realized, 0.0) / eta
+    short_out = np.maximum(realized - desired, 0.0) * eta
+    cut = np.minimum(short_in, grid_charge)
+    grid_charge -= cut
+    charge = np.maximum(charge - (short_in - cut), 0.0)
+    cut = np.minimum(short_out, grid_discharge)
+    grid_discharge -= cut
+    discharge = np.maximum(discharge - (short_out - cut), 0.0)
+
+    return {
+        'import': cons - discharge + grid_charge,
+        'export': ret - charge + grid_discharge,
+        'soc': soc,
+        'charged': (charge + grid_charge).sum(axis=0),
+        'discharged': (discharge + grid_discharge).sum(axis=0),
+        'self_consumed': discharge.sum(axis=0),
+    }
+
+
+def battery_costs(sim, eb_per_kwh, price=None, fixed_price=DEFAULT_FIXED_PRICE,
+                  feed_in_price=DEFAULT_FEED_IN_PRICE, opslag=DEFAULT_OPSLAG, saldering=True):
+    """Energiekosten per configuratie over de gesimuleerde periode, vast en (met prijzen) dynamisch.
+
+    Vaste kosten en netbeheer zijn voor elke batterijgrootte gelijk en tellen niet
+    mee; alleen verschillen tussen configuraties zijn zinvol. Met `saldering`
+    wordt teruglevering tot het eigen verbruik weggestreept tegen het leveringstarief.
+    """
+    imp = sim['import'].sum(axis=0)
+    exp = sim['export'].sum(axis=0)
+    price_in = fixed_price + eb_per_kwh
+    if saldering:
+        fixed = np.maximum(imp - exp, 0.0) * price_in - np.maximum(exp - imp, 0.0) * feed_in_price
+    else:
+        fixed = imp * price_in - exp * feed_in_price
+
+    costs = {'fixed': fixed, 'dynamic': None}
+    if price is not None:
+        priced = (~np.isnan(price)).astype('float64')
+        epex = np.where(priced > 0, price, 0.0)
+        imp_p = priced @ sim['import']
+        exp_p = priced @ sim['export']
+        levering = ((epex + opslag * priced) @ sim['import']) * BTW
+        vergoeding = (epex @ sim['export']) * BTW
+        eb = np.maximum(imp_p - exp_p, 0.0) if saldering else imp_p
+        costs['dynamic'] = levering - vergoeding + eb * eb_per_kwh
+    return costs
+
+
+def sweep_batteries(consumption, returned, capacity_kwh, power_kw, eb_per_kwh, efficiency=0.9,
+                    strategy='self_consumption', price=None, day=None, interval_h=INTERVAL_H, **tariffs):
+    """Totalen en kosten per configuratie; simuleert in blokken zodat het geheugen begrensd blijft.
+
+    `interval_h` is de lengte van een interval in uur. Extra keyword-argumenten gaan naar `battery_costs`. Geeft een dict met arrays
+    van lengte K: `import`, `export`, `charged`, `discharged`, `self_consumed`,
+    `fixed` en (met prijzen) `dynamic`.
+    """
+    capacity = np.asarray(capacity_kwh, dtype='float64')
+    power = np.asarray(power_kw, dtype='float64')
+    block = max(1, BLOCK_CELLS // max(len(consumption), 1))
+    parts = []
+    for start in range(0, len(capacity), block):
+        sl = slice(start, start + block)
+        sim = simulate_batteries(consumption, returned, capacity[sl], power[sl], efficiency, strategy,
+                                 price=price, day=day, interval_h=interval_h)
+        costs = battery_costs(sim, eb_per_kwh, price=price, **tariffs)
+        parts.append({
+            'import': sim['import'].sum(axis=0),
+            'export': sim['export'].sum(axis=0),
+            'charged': sim['charged'],
+            'discharged': sim['discharged'],
+            'self_consumed': sim['self_consumed'],
+            'fixed': costs['fixed'],
+            'dynamic': costs['dynamic'],
+        })
+    result = {key: np.concatenate([p[key] for p in parts]) for key in parts[0] if key != 'dynamic'}
+    result['dynamic'] = None if price is None else np.concatenate([p['dynamic'] for p in parts])
+    return result
@@ -0,0 +1,174 @@
+"""Vergelijkt opstarttijd, geheugen per worker en doorvoer van de serveermodi.
+
+Gebruik:
+    python benchmarks/bench_serving.py uploads/real_data.json [--workers 4] [--clients 16] [--seconds 10]
+
+Modi:
+    dev        Flask development server (één proces)
+    nopreload  gunicorn, elke worker laadt de datasets zelf (GUNICORN_PRELOAD=0)
+    preload    gunicorn met preload_app: datasets in de master, gedeeld via copy-on-write
+
+Opstarttijd is de tijd tot het eerste geslaagde antwoord van /api/load-local-data.
+Geheugen komt uit /proc/<pid>/smaps_rollup (alleen Linux): USS is wat een proces
+echt alleen heeft, PSS verdeelt gedeelde pagina's over de processen die ze delen.
+"""
+import argparse
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = ('dev', 'nopreload', 'preload')
+ENDPOINTS = [
+    '/api/load-local-data',
+    '/api/month-detail/3',
+    '/api/hourly-detail/3',
+    '/api/compare-contracts',
+    '/api/usage?resolution=day',
+    '/api/usage?resolution=hour&start=2024-03-01&end=2024-04-01',
+]
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _command(mode, port, workers):
+    if mode == 'dev':
+        return [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--port', str(port)]
+    return [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}',
+            '--workers', str(workers), 'wsgi:application']
+
+
+def _get(url):
+    with urllib.request.urlopen(url, timeout=60) as response:
+        response.read()
+        return response.status
+
+
+def _wait_ready(base, proc, limit=120):
+    start = time.perf_counter()
+    while time.perf_counter() - start < limit:
+        if proc.poll() is not None:
+            raise RuntimeError(f'Server gestopt met code {proc.returncode}')
+        try:
+            if _get(base + ENDPOINTS[0]) == 200:
+                return time.perf_counter() - start
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError('Server niet op tijd bereikbaar')
+
+
+def _children(pid):
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+
+def _memory_mb(pid):
+    """(USS, PSS) in MB uit smaps_rollup, of None buiten Linux."""
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line and not line.startswith('0'))
+    except OSError:
+        return None
+    kb = {k: int(v.split()[0]) for k, v in fields.items() if v.strip().endswith('kB')}
+    uss = kb.get('Private_Clean', 0) + kb.get('Private_Dirty', 0)
+    return uss / 1024, kb.get('Pss', 0) / 1024
+
+
+def _load(base, clients, seconds):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop = time.perf_counter() + seconds
+
+    def client(offset):
+        i = offset
+        while time.perf_counter() < stop:
+            url = base + ENDPOINTS[i % len(ENDPOINTS)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                ok = _get(url) == 200
+            except OSError:
+                ok = False
+            with lock:
+                if ok:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client, args=(c,)) for c in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors[0]
+
+
+def run_mode(mode, path, workers, clients, seconds):
+    port = _free_port()
+    env = dict(os.environ, ENERGY_DATA_FILE=os.path.abspath(path), GUNICORN_ACCESS_LOG='',
+               GUNICORN_PRELOAD='0' if mode == 'nopreload' else '1')
+    proc = subprocess.Popen(_command(mode, port, workers), cwd=BACKEND_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f'http://127.0.0.1:{port}'
+    try:
+        startup = _wait_ready(base, proc)
+        latencies, errors = _load(base, clients, seconds)
+        # Geheugen na de belasting: elke worker heeft dan alle endpoints geraakt
+        pids = _children(proc.pid) if mode != 'dev' else [proc.pid]
+        memory = [m for m in (_memory_mb(pid) for pid in pids) if m is not None]
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+    latencies.sort()
+    return {
+        'mode': mode,
+        'startup_s': startup,
+        'requests_per_s': len(latencies) / seconds,
+        'p50_ms': 1000 * statistics.median(latencies) if latencies else None,
+        'p95_ms': 1000 * latencies[int(0.95 * (len(latencies) - 1))] if latencies else None,
+        'errors': errors,
+        'processes': len(memory),
+        'uss_mb': statistics.mean(m[0] for m in memory) if memory else None,
+        'pss_mb': statistics.mean(m[1] for m in memory) if memory else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+
+    print(f"Bestand: {args.path}, {args.workers} workers, {args.clients} clients, {args.seconds:.0f} s per modus")
+    for mode in args.modes:
+        r = run_mode(mode, args.path, args.workers, args.clients, args.seconds)
+        memory = (f"USS {r['uss_mb']:.1f} MB, PSS {r['pss_mb']:.1f} MB per proces ({r['processes']})"
+                  if r['uss_mb'] is not None else 'geheugen onbekend')
+        print(f"{mode:>9}: start {r['startup_s']:.2f} s, {r['requests_per_s']:.1f} req/s, "
+              f"p50 {r['p50_ms']:.1f} ms, p95 {r['p95_ms']:.1f} ms, {r['errors']} fouten, {memory}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Vergelijkt piek-RSS en wandkloktijd van de JSON- en streaming-parser.
+
+Gebruik:
+    python benchmarks/bench_streaming_parse.py uploads/real_data.json [--repeat 3]
+
+Elke meting draait in een eigen subprocess, zodat `ru_maxrss` alleen de
+betreffende parser meet.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+MODES = ('json', 'stream')
+
+
+def _max_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux rapporteert KiB, macOS bytes
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def run_child(mode, path):
+    from calculator import EnergyCalculator
+
+    baseline = _max_rss_mb()
+    start = time.perf_counter()
+    calc = EnergyCalculator(path, use_ingest_cache=False, streaming=(mode == 'stream'))
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        'mode': mode,
+        'rows': len(calc.store),
+        'seconds': round(elapsed, 4),
+        'peak_rss_mb': round(_max_rss_mb(), 1),
+        'import_rss_mb': round(baseline, 1)
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--child', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.path)
+        return
+
+    size_mb = os.path.getsize(args.path) / (1024 * 1024)
+    print(f"Bestand: {args.path} ({size_mb:.1f} MB)")
+    for mode in MODES:
+        runs = []
+        for _ in range(args.repeat):
+            out = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), args.path, '--child', mode],
+                check=True, capture_output=True, text=True
+            )
+            runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        best = min(runs, key=lambda r: r['seconds'])
+        peak = max(r['peak_rss_mb'] for r in runs)
+        print(f"{mode:>6}: {best['rows']} rijen, {best['seconds']:.3f} s, "
+              f"piek RSS {peak:.1f} MB (na imports {best['import_rss_mb']:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""Benchmarksuite voor de backend op synthetische data van verschillende groottes.
+
+Gebruik:
+    python benchmarks/run_benchmarks.py --years 0.25 1 3 -o bench_results.json
+    python benchmarks/run_benchmarks.py --compare bench_results.json
+
+Per datagrootte worden de belangrijkste paden van `EnergyCalculator` en elk
+Flask-endpoint (via de test client) getimed. Het resultaat is een JSON-bestand
+met commit, omgeving en per benchmark min/mediaan, zodat regressies tussen
+commits te vergelijken zijn met `--compare`.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import app as backend_app  # noqa: E402
+from calculator import EnergyCalculator  # noqa: E402
+from dataset_cache import DatasetCache  # noqa: E402
+from synthetic import write_export  # noqa: E402
+
+CATALOG_PATH = os.path.join(BACKEND_DIR, 'contracten_energie')
+
+ENDPOINTS = [
+    '/api/load-local-data',
+    '/api/load-local-data?hoog=2500&laag=1500',
+    '/api/month-detail/3',
+    '/api/hourly-detail/3',
+    '/api/compare-contracts',
+    '/api/usage?resolution=day',
+]
+
+
+def _time(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_size(years, repeat, workdir):
+    path = os.path.join(workdir, f"export_{years:g}y.json")
+    write_export(path, years=years)
+    results = []
+
+    def record(name, timings, **extra):
+        results.append({
+            'years': years,
+            'benchmark': name,
+            'min_s': round(min(timings), 6),
+            'median_s': round(statistics.median(timings), 6),
+            'repeat': len(timings),
+            **extra
+        })
+
+    # Ingest: koude JSON-parse, streaming-parse en het openen van de sidecar. De instanties
+    # worden buiten de meting gebouwd; de constructor laadt en labelt de data zelf al
+    json_calc = EnergyCalculator(path, use_ingest_cache=False, streaming=False)
+    stream_calc = EnergyCalculator(path, use_ingest_cache=False, streaming=True)
+    sidecar_calc = EnergyCalculator(path)  # schrijft de sidecar
+    record('load_and_shape_data[json]', _time(json_calc._load_and_shape_data, repeat))
+    record('load_and_shape_data[stream]', _time(stream_calc._load_and_shape_data, repeat))
+    record('load_and_shape_data[sidecar]', _time(sidecar_calc._load_and_shape_data, repeat))
+
+    calc = EnergyCalculator(path, use_ingest_cache=False)
+    calc.fixed_path = CATALOG_PATH
+    intervals = len(calc.store)
+    record('calculate', _time(lambda: calc.calculate(), repeat), intervals=intervals)
+    record('calculate[manual]', _time(lambda: calc.calculate(2500, 1500), repeat), intervals=intervals)
+
+    # Analytics op een verse instantie (koude rollups) en daarna warm
+    record('get_hourly_analytics[cold]',
+           _time(lambda: EnergyCalculator(path).get_hourly_analytics(), repeat), intervals=intervals)
+    record('get_hourly_analytics', _time(lambda: calc.get_hourly_analytics(), repeat), intervals=intervals)
+    record('get_daily_usage_for_month', _time(lambda: calc.get_daily_usage_for_month(3), repeat), intervals=intervals)
+
+    # Flask-endpoints: eerste request met lege cache, daarna warm
+    backend_app.DATA_FILE = path
+    client = backend_app.app.test_client()
+    for url in ENDPOINTS:
+        cold = []
+        for _ in range(repeat):
+            backend_app.DATASET_CACHE.invalidate()
+            cold.extend(_time(lambda: client.get(url), 1))
+        record(f"GET {url}[cold]", cold, intervals=intervals)
+        record(f"GET {url}", _time(lambda: client.get(url), repeat), intervals=intervals)
+
+    os.remove(path)
+    return results
+
+
+def compare(current, previous_path):
+    with open(previous_path) as f:
+        previous = json.load(f)
+    before = {(r['years'], r['benchmark']): r['median_s'] for r in previous['results']}
+    print(f"\nVergelijking met {previous.get('commit')} ({previous_path}):")
+    for r in current['results']:
+        old = before.get((r['years'], r['benchmark']))
+        if old:
+            ratio = r['median_s'] / old
+            flag = '  REGRESSIE' if ratio > 1.2 else ''
+            print(f"  {r['years']:>5g}y {r['benchmark']:<45} {old * 1000:9.2f} -> {r['median_s'] * 1000:9.2f} ms "
+                  f"({ratio:.2f}x){flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--years', type=float, nargs='+', default=[0.25, 1.0, 3.0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('-o', '--output', default='bench_results.json')
+    parser.add_argument('--compare', help='Eerder resultaatbestand om mee te vergelijken')
+    args = parser.parse_args()
+
+    # Eigen cache zodat de benchmark niet afhangt van DATASET_CACHE_MB
+    backend_app.DATASET_CACHE = DatasetCache()
+
+    report = {
+        'commit': _git_commit(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': []
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for years in args.years:
+            print(f"Benchmark {years:g} jaar...", flush=True)
+            report['results'].extend(bench_size(years, args.repeat, workdir))
+
+    for r in report['results']:
+        print(f"  {r['years']:>5g}y {r['benchmark']:<45} {r['median_s'] * 1000:9.2f} ms")
+
+    if args.compare:
+        compare(report, args.compare)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResultaten geschreven naar {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,27 +1,129 @@
+import numpy as np
 import pandas as pd
 import os
 import json
+import ingest_cache
+import stream_parser
+from tariffs import get_tariff_calendar
+from contracts import compare_scenarios, load_catalog
+from dynamic_pricing import load_dynamic_contracts, load_price_store, price_dynamic_contracts
+from rollups import RollupCube
+from interval_store import TIMEZONE, IntervalStore
+from usage_query import query_usage
+from append_pipeline import merge_intervals, merge_stores
+from meter_ingest import gap_summary, native_step, shaped_frame
+from battery import DEFAULT_C_RATE, DEFAULT_FEED_IN_PRICE, DEFAULT_FIXED_PRICE, DEFAULT_OPSLAG, sweep_batteries
+from metrics import stage
+from dataset_cache import file_version
+
+# Korte gaten (tot 4 uur) in de meterdata worden bij het inlezen lineair opgevuld
+FILL_GAPS = True
+
+# Exports boven deze grootte worden streaming geparsed om het piekgeheugen te begrenzen
+STREAMING_THRESHOLD_BYTES = 64 * 1024 * 1024
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+PRICES_FILE = os.path.join(DATA_DIR, 'Netherlands.csv')
+DYNAMIC_FILE = os.path.join(DATA_DIR, 'dynamic_contracts.csv')
+FIXED_FILE = os.path.join(DATA_DIR, 'vast_contract_energie.csv')
+
+def dataset_version(input_path):
+    """Versie van export, append-log en referentiedata; verandert zodra één daarvan wijzigt."""
+    companions = (ingest_cache.append_log_path(input_path), PRICES_FILE, DYNAMIC_FILE, FIXED_FILE)
+    return file_version(input_path, companions)
+
+def shape_records(records, fill_gaps=FILL_GAPS, kind='auto', previous=None):
+    """Zet een lijst `energyassetbundles`-records om naar het geshapete frame (NL-tijd index).
+
+    Telwerkstanden en intervalwaarden gaan allebei door `meter_ingest`; het
+    kwaliteitsoverzicht staat daarna in `df.attrs['quality']`. `kind` gaat door
+    naar `shaped_frame` (één type of een dict per reeks). `previous` geeft per reeks
+    de laatste eerder opgeslagen telwerkstand (`{'ts', 'value'}`); die gaat vóór de
+    records, zodat het interval tussen de opgeslagen en de nieuwe standen meetelt.
+    """
+    if not records: return pd.DataFrame()
+
+    df_raw = pd.DataFrame(records)
+
+    # UTC-epoch in ns; de omzetting naar NL tijd gebeurt één keer bij het bouwen van het frame
+    with stage('tz_convert', rows=len(df_raw)):
+        ts = pd.DatetimeIndex(pd.to_datetime(df_raw['timestamp'], utc=True)).as_unit('ns').asi8
+
+    # Categorie 27 = Verbruik, Categorie 26 = Teruglevering
+    category = df_raw['energyassetcategory'].to_numpy()
+    values = pd.to_numeric(df_raw['value'], errors='coerce').to_numpy(dtype='float64')
+    cons = category == 27
+    ret = category == 26
+    series = {'consumption': (ts[cons], values[cons]), 'return': (ts[ret], values[ret])}
+    for name, reading in (previous or {}).items():
+        series_ts, series_values = series[name]
+        # Alleen vóór een chunk die erna begint; een correctie van oudere data rekent vanaf zichzelf
+        if reading and len(series_ts) and reading['ts'] < series_ts.min():
+            series[name] = (np.r_[reading['ts'], series_ts], np.r_[reading['value'], series_values])
+    with stage('meter_ingest', rows=int(cons.sum() + ret.sum())):
+        return shaped_frame(series['consumption'], series['return'], kind=kind, fill_gaps=fill_gaps)
+
+def _newest_reading(stored, uploaded):
+    """De recentste van twee telwerkstanden (`{'ts', 'value'}` of None)."""
+    if stored is None or (uploaded is not None and uploaded['ts'] >= stored['ts']):
+        return uploaded
+    return stored
 
 class EnergyCalculator:
-    def __init__(self, input_path):
+    def __init__(self, input_path, cache=None, use_ingest_cache=True, streaming=None, tariff_calendar=None):
         self.current_dir = os.path.dirname(os.path.abspath(__file__))
         self.input_path = input_path
-        self.prices_path = os.path.join(self.current_dir, 'data', 'Netherlands.csv')
-        self.dynamic_path = os.path.join(self.current_dir, 'data', 'dynamic_contracts.csv')
-        self.fixed_path = os.path.join(self.current_dir, 'data', 'vast_contract_energie.csv')
+        self.use_ingest_cache = use_ingest_cache
+        self.streaming = streaming
+        self.tariff_calendar = tariff_calendar or get_tariff_calendar()
+        self.cache = cache
+        self._rollups = None
+        self._df = None
+        # Later geüploade intervallen tellen mee in de versie van de dataset
+        self._companions = (ingest_cache.append_log_path(input_path),)
+        self.prices_path = PRICES_FILE
+        self.dynamic_path = DYNAMIC_FILE
+        self.fixed_path = FIXED_FILE
         
         # Constanten voor de Nederlandse markt (incl. BTW)
         self.EB_PER_KWH = 0.13165  
         self.NETBEHEER_JAAR = 560.00  
         
-        self.df = self._load_and_shape_data()
-        if not self.df.empty:
-            self.df['is_normaal'] = self.df.index.map(self._is_normaal_tarief)
+        # Met een gedeelde DatasetCache wordt het bestand maar één keer per versie geparsed
+        if cache is not None:
+            self.store = cache.get(input_path, self._build_dataset, variant=self.tariff_calendar.key,
+                                   companions=self._companions)
+        else:
+            self.store = self._build_dataset()
+
+    def _build_dataset(self):
+        """Compacte IntervalStore incl. tarieflabels; wordt na aanmaak niet meer gemuteerd."""
+        df = self._load_and_shape_data()
+        # Ma-vr 07:00-23:00 (afhankelijk van netbeheerder) is normaal; weekend en feestdagen dal
+        with stage('tariff_labels', rows=len(df)):
+            return IntervalStore.from_frame(df, self.tariff_calendar)
 
-    def _is_normaal_tarief(self, dt):
-        """Ma-vr 07:00-23:00 geldt als normaaltarief."""
-        if dt.weekday() >= 5: return False
-        return 7 <= dt.hour < 23
+    @property
+    def df(self):
+        """Het geshapete frame (NL-tijd index); pas op aanvraag uit de store opgebouwd."""
+        if self._df is None:
+            self._df = self.store.to_frame()
+        return self._df
+
+    @property
+    def rollups(self):
+        """Dag- en uurtotalen per (jaar, maand); via de cache gedeeld tussen requests."""
+        if self._rollups is None:
+            def build():
+                with stage('rollups', rows=len(self.store)):
+                    return RollupCube.from_store(self.store)
+            if self.cache is not None:
+                # De rollups splitsen normaal/dal, dus per tariefkalender een eigen entry
+                self._rollups = self.cache.get(self.input_path, build, variant=('rollups', self.tariff_calendar.key),
+                                               companions=self._companions)
+            else:
+                self._rollups = build()
+        return self._rollups
 
     def get_seasonal_factor(self, month, is_solar=False):
         """Geeft het gewicht van een specifieke maand voor een jaarlijkse schatting."""
@@ -34,89 +136,256 @@ class EnergyCalculator:
         return profiles.get(month, 0.083)
 
     def _load_and_shape_data(self):
-        """Parseert JSON, corrigeert tijdzones en filtert foutieve meterstanden."""
-        with open(self.input_path, 'r') as f:
-            raw_data = json.load(f)
-        
-        records = raw_data.get('energyassetbundles', [])
-        if not records: return pd.DataFrame()
+        """Basisexport (sidecar of JSON) aangevuld met de intervallen uit het append-log."""
+        df = self._load_base_data()
+        appended = ingest_cache.read_append_log(self.input_path)
+        if appended is not None:
+            # Na een upload staat het bijgewerkte overzicht (o.a. de laatste telwerkstand) bij het log
+            quality = appended.attrs.get('quality', df.attrs.get('quality'))
+            df, _ = merge_intervals(df, appended)
+            if quality is not None:
+                df.attrs['quality'] = quality
+        return df
 
-        df_raw = pd.DataFrame(records)
-        
-        # Converteer UTC naar NL tijd om datacorruptie over maandgrenzen (bijv. dec/jan) te voorkomen
-        df_raw['timestamp'] = pd.to_datetime(df_raw['timestamp'], utc=True).dt.tz_convert('Europe/Amsterdam')
+    def _load_base_data(self):
+        """Laadt de geshapete reeksen uit de binaire sidecar, of parseert de JSON en schrijft die weg."""
+        if not self.use_ingest_cache:
+            return self._parse_json()
 
-        # Categorie 27 = Verbruik, Categorie 26 = Teruglevering
-        cons = df_raw[df_raw['energyassetcategory'] == 27].copy()
-        ret = df_raw[df_raw['energyassetcategory'] == 26].copy()
+        with stage('read_sidecar') as st:
+            df = ingest_cache.load_sidecar(self.input_path)
+            st.set_rows(None if df is None else len(df))
+        if df is not None:
+            return df
 
-        # .clip(lower=0) verwijdert negatieve pieken (storingen of herstarts van de slimme meter)
-        cons['consumption_interval'] = cons['value'].clip(lower=0)
-        ret['return_interval'] = ret['value'].clip(lower=0)
+        source_key = ingest_cache.source_key(self.input_path)
+        df = self._parse_json()
+        ingest_cache.write_sidecar(self.input_path, df, source_key)
+        return df
 
-        cons = cons[['timestamp', 'consumption_interval']].set_index('timestamp')
-        ret = ret[['timestamp', 'return_interval']].set_index('timestamp')
+    def _parse_json(self):
+        """Parseert JSON, corrigeert tijdzones en filtert foutieve meterstanden."""
+        streaming = self.streaming
+        if streaming is None:
+            streaming = os.path.getsize(self.input_path) > STREAMING_THRESHOLD_BYTES
+        if streaming:
+            with stage('parse_stream') as st:
+                df = stream_parser.parse_streaming(self.input_path, fill_gaps=FILL_GAPS)
+                st.set_rows(len(df))
+            return df
 
-        df = pd.concat([cons['consumption_interval'], ret['return_interval']], axis=1).fillna(0)
-        return df.sort_index()
+        with stage('parse_json') as st:
+            with open(self.input_path, 'r') as f:
+                raw_data = json.load(f)
+            records = raw_data.get('energyassetbundles', [])
+            st.set_rows(len(records))
+        with stage('shape_records', rows=len(records)):
+            return shape_records(records)
 
-    def calculate(self, manual_hoog=None, manual_laag=None):
-        """Berekent de contractkosten op basis van data-schatting of handmatige invoer."""
-        if self.df.empty: return []
+    def estimate_yearly(self, manual_hoog=None, manual_laag=None):
+        """Schat jaarverbruik, jaarteruglevering en het aandeel normaaltarief."""
+        with stage('estimate'):
+            return self._estimate_yearly(manual_hoog, manual_laag)
 
-        # 1. Bepaal het data-gedreven verbruik
-        months_in_data = self.df.index.month.unique()
+    def _estimate_yearly(self, manual_hoog, manual_laag):
+        # 1. Bepaal het data-gedreven verbruik (uit de rollups, dus zonder scan over alle intervallen)
+        actual_cons, actual_ret, actual_normaal, months_in_data = self.rollups.totals()
         weight_cons = sum(self.get_seasonal_factor(m, is_solar=False) for m in months_in_data)
         weight_solar = sum(self.get_seasonal_factor(m, is_solar=True) for m in months_in_data)
 
-        actual_cons = self.df['consumption_interval'].sum()
-        actual_ret = self.df['return_interval'].sum()
-
         est_yearly_return = (actual_ret / weight_solar) if weight_solar > 0 else actual_ret * 12
 
         # 2. Overschrijf verbruik als de gebruiker de UI-inputs gebruikt
         if manual_hoog is not None and manual_laag is not None:
             est_yearly_usage = float(manual_hoog) + float(manual_laag)
+            share_normaal = float(manual_hoog) / est_yearly_usage if est_yearly_usage > 0 else 0.0
         else:
             est_yearly_usage = (actual_cons / weight_cons) if weight_cons > 0 else actual_cons * 12
+            share_normaal = float(actual_normaal / actual_cons) if actual_cons > 0 else 0.0
+
+        return float(est_yearly_usage), float(est_yearly_return), share_normaal
+
+    def compare_scenarios(self, usage, returned, share_normaal):
+        """Alle contracten × alle verbruiksscenario's in één gevectoriseerde doorrekening."""
+        with stage('contract_catalog'):
+            catalog = load_catalog(self.fixed_path)
+        with stage('compare_contracts', rows=len(catalog)):
+            return compare_scenarios(catalog, usage, returned, share_normaal, self.EB_PER_KWH, self.NETBEHEER_JAAR)
+
+    def calculate(self, manual_hoog=None, manual_laag=None):
+        """Berekent de contractkosten op basis van data-schatting of handmatige invoer."""
+        if self.store.empty: return []
+        if not os.path.exists(self.fixed_path): return []
+
+        est_yearly_usage, est_yearly_return, share_normaal = self.estimate_yearly(manual_hoog, manual_laag)
+        est_usage_normaal = est_yearly_usage * share_normaal
+        est_usage_dal = est_yearly_usage - est_usage_normaal
+
+        comparison = self.compare_scenarios(est_yearly_usage, est_yearly_return, share_normaal)
+        catalog = comparison.catalog
+        yearly = comparison.yearly[0]
+        return [{
+            'id': str(catalog.ids[i]),
+            'provider': catalog.providers[i],
+            'type': str(catalog.types[i]),
+            'monthlyCost': round(float(yearly[i]) / 12, 2),
+            'yearlyCost': round(float(yearly[i]), 2),
+            'estUsage': round(est_yearly_usage, 0),
+            'estUsageNormaal': round(est_usage_normaal, 0),
+            'estUsageDal': round(est_usage_dal, 0),
+            'estReturn': round(est_yearly_return, 0)
+        } for i in range(len(catalog))]
+
+    def append_readings(self, records):
+        """Voegt een nieuwe `energyassetbundles`-chunk toe aan de opgeslagen reeks.
 
-        all_results = []
-        if os.path.exists(self.fixed_path):
-            fixed_df = pd.read_csv(self.fixed_path)
-            for idx, row in fixed_df.iterrows():
-                p_normaal = float(str(row['Normaal']).replace(',', '.'))
-                
-                # Salderen: Netto stroomverbruik (minimaal 0)
-                netto_verbruik = max(0, est_yearly_usage - est_yearly_return)
-                totaal_jaar = (netto_verbruik * (p_normaal + self.EB_PER_KWH)) + (7.0 * 12) + self.NETBEHEER_JAAR
-                
-                all_results.append({
-                    'id': str(row.get('id', f"fix-{idx}")),
-                    'provider': row['Energieleverancier'],
-                    'type': 'Vast' if 'Vast' in str(row['Contract']) else 'Variabel',
-                    'monthlyCost': round(totaal_jaar / 12, 2),
-                    'yearlyCost': round(totaal_jaar, 2),
-                    'estUsage': round(est_yearly_usage, 0),
-                    'estReturn': round(est_yearly_return, 0)
-                })
-        return all_results
+        Overlappende tijdstempels worden vervangen. Alleen de nieuwe chunk wordt
+        geparsed en gelabeld; de rollups (en daarmee de schattingen) worden
+        incrementeel bijgewerkt en direct in de cache gezet.
+
+        Een chunk is te kort om telwerk en intervaldata betrouwbaar te onderscheiden;
+        elke reeks houdt het type dat bij het inlezen van de export is herkend.
+        """
+        quality = self.store.quality or {}
+        kinds = {name: q.get('kind', 'interval') for name, q in quality.items()}
+        previous = {name: q.get('last_reading') for name, q in quality.items()}
+        chunk = shape_records(records, kind={'consumption': 'interval', 'return': 'interval', **kinds},
+                              previous=previous)
+        if chunk.empty:
+            return {'added': 0, 'replaced': 0}
+        chunk_store = IntervalStore.from_frame(chunk, self.tariff_calendar)
+
+        # Samenvoegen op de kolommen van de store; het frame van de hele historie wordt niet gebouwd
+        merged, replaced = merge_stores(self.store, chunk_store)
+        rollups = self.rollups.copy()
+        rollups.update(replaced, sign=-1)
+        rollups.update(chunk_store)
+
+        if self.store.quality is not None:
+            merged.quality = {name: {**q, 'last_reading': _newest_reading(
+                q.get('last_reading'), chunk.attrs['quality'].get(name, {}).get('last_reading'))}
+                for name, q in self.store.quality.items()}
+        ingest_cache.append_to_log(self.input_path, chunk, quality=merged.quality)
+        self.store = merged
+        self._df = None
+        self._rollups = rollups
+        if self.cache is not None:
+            self.cache.put(self.input_path, self.store, variant=self.tariff_calendar.key, companions=self._companions)
+            self.cache.put(self.input_path, rollups, variant=('rollups', self.tariff_calendar.key), companions=self._companions)
+        return {'added': int(len(chunk) - len(replaced)), 'replaced': int(len(replaced))}
+
+    def calculate_dynamic(self, manual_hoog=None, manual_laag=None):
+        """Prijst alle dynamische contracten per interval tegen de EPEX-prijzen en het eigen profiel."""
+        if self.store.empty: return []
+        if not (os.path.exists(self.prices_path) and os.path.exists(self.dynamic_path)): return []
+
+        with stage('price_store'):
+            store = load_price_store(self.prices_path)
+            contracts = load_dynamic_contracts(self.dynamic_path)
+        est_yearly_usage, est_yearly_return, _ = self.estimate_yearly(manual_hoog, manual_laag)
+
+        with stage('dynamic_pricing', rows=len(self.store)):
+            priced = price_dynamic_contracts(
+                self.store.ts, self.store.cons, self.store.ret,
+                store, contracts, self.EB_PER_KWH, self.NETBEHEER_JAAR,
+                yearly_usage=est_yearly_usage, yearly_return=est_yearly_return
+            )
+        coverage = priced['priced_intervals'] / priced['total_intervals'] if priced['total_intervals'] else 0.0
+        avg_price = priced['avg_price']
+        return [{
+            'id': f"dyn-{i}",
+            'provider': contracts.providers[i],
+            'type': 'Dynamisch',
+            'monthlyCost': round(float(yearly) / 12, 2),
+            'yearlyCost': round(float(yearly), 2),
+            'estUsage': round(est_yearly_usage, 0),
+            'estReturn': round(est_yearly_return, 0),
+            'avgEpexPrice': None if avg_price is None else round(avg_price, 4),
+            'priceCoverage': round(coverage, 3)
+        } for i, yearly in enumerate(priced['yearly'])]
+
+    def simulate_battery(self, capacities, power_kw=None, efficiency=0.9, strategy='self_consumption',
+                         fixed_price=DEFAULT_FIXED_PRICE, feed_in_price=DEFAULT_FEED_IN_PRICE, saldering=True):
+        """Jaarlijkse besparing van een thuisbatterij per capaciteit, vast en (met EPEX-prijzen) dynamisch.
+
+        Alle capaciteiten worden in één gebatchte simulatie doorgerekend, samen met een
+        referentie zonder batterij. Zonder `power_kw` is het vermogen 0.5C.
+        """
+        if self.store.empty: return []
+        capacities = np.asarray(capacities, dtype='float64')
+        power = capacities * DEFAULT_C_RATE if power_kw is None else np.full(len(capacities), float(power_kw))
+        capacity = np.r_[0.0, capacities]
+        power = np.r_[0.0, power]
+        # Uur- en dagexports houden hun eigen stap; het vermogen per interval schaalt mee
+        interval_h = native_step(self.store.ts) / 3.6e12
+
+        price, opslag = None, DEFAULT_OPSLAG
+        if os.path.exists(self.prices_path):
+            with stage('price_store'):
+                price = load_price_store(self.prices_path).align_ns(self.store.ts)
+                if os.path.exists(self.dynamic_path):
+                    contracts = load_dynamic_contracts(self.dynamic_path)
+                    # Vergelijk met het goedkoopste dynamische contract
+                    if len(contracts): opslag = float(np.min(contracts.opslag))
+
+        with stage('battery_sweep', rows=len(self.store) * len(capacity)):
+            totals = sweep_batteries(
+                self.store.cons, self.store.ret, capacity, power, self.EB_PER_KWH, efficiency, strategy,
+                price=price, day=self.store.day_key(), interval_h=interval_h,
+                fixed_price=fixed_price, feed_in_price=feed_in_price, opslag=opslag, saldering=saldering
+            )
+
+        # Opschalen van de meetperiode naar een jaar
+        scale = 365.25 * 24 / (len(self.store) * interval_h)
+        fixed = totals['fixed'] * scale
+        dynamic = None if totals['dynamic'] is None else totals['dynamic'] * scale
+        coverage = None if price is None else round(float(np.mean(~np.isnan(price))), 3)
+        results = []
+        for k in range(1, len(capacity)):
+            results.append({
+                'capacityKwh': round(float(capacity[k]), 2),
+                'powerKw': round(float(power[k]), 2),
+                'yearlyImportKwh': round(float(totals['import'][k] * scale), 0),
+                'yearlyExportKwh': round(float(totals['export'][k] * scale), 0),
+                'yearlySelfConsumedKwh': round(float(totals['self_consumed'][k] * scale), 0),
+                'yearlyCycles': round(float(totals['discharged'][k] * scale / capacity[k]), 1) if capacity[k] > 0 else 0.0,
+                'fixedYearlyCost': round(float(fixed[k]), 2),
+                'fixedYearlySavings': round(float(fixed[0] - fixed[k]), 2),
+                'dynamicYearlyCost': None if dynamic is None else round(float(dynamic[k]), 2),
+                'dynamicYearlySavings': None if dynamic is None else round(float(dynamic[0] - dynamic[k]), 2),
+                'priceCoverage': coverage
+            })
+        return results
+
+    def get_data_quality(self):
+        """Gaten in de huidige reeks (incl. uploads) plus het ingest-overzicht per meterreeks."""
+        return {**gap_summary(self.store.ts), 'series': self.store.quality or {}}
 
     def get_summary(self):
-        total_used = float(self.df['consumption_interval'].sum())
-        total_ret = float(self.df['return_interval'].sum())
+        total_used, total_ret, _, _ = self.rollups.totals()
+        if self.store.empty:
+            return {'total_kwh': 0.0, 'total_return_kwh': 0.0, 'date_range': {'start': 'NaT', 'end': 'NaT'},
+                    'data_quality': self.get_data_quality()}
+        # De store is gesorteerd, dus begin en eind zijn het eerste en laatste interval
+        first, last = (pd.Timestamp(int(ts), tz='UTC').tz_convert(TIMEZONE) for ts in self.store.ts[[0, -1]])
         return {
             'total_kwh': round(total_used, 2),
             'total_return_kwh': round(total_ret, 2),
-            'date_range': {'start': str(self.df.index.min()), 'end': str(self.df.index.max())}
+            'date_range': {'start': str(first), 'end': str(last)},
+            'data_quality': self.get_data_quality()
         }
 
     def get_hourly_analytics(self):
-        hourly = self.df.groupby(self.df.index.hour).agg({
-            'consumption_interval': 'mean',
-            'return_interval': 'mean'
-        })
-        return {str(h): {'verbruik': round(hourly.loc[h, 'consumption_interval'], 3),
-                         'teruglevering': round(hourly.loc[h, 'return_interval'], 3)} for h in hourly.index}
+        hourly = self.rollups.hourly_means()
+        return {str(h): {'verbruik': round(cons, 3),
+                         'teruglevering': round(ret, 3)} for h, cons, ret in hourly}
+
+    def get_hourly_for_month(self, month, year=None):
+        """Gemiddeld verbruik per uur van de dag binnen één maand (standaard het laatste jaar met data)."""
+        year = year or self.rollups.latest_year(month)
+        if year is None: return []
+        return [{'hour': h, 'verbruik': cons, 'teruglevering': ret}
+                for h, cons, ret in self.rollups.hourly_means(year, month)]
 
     def get_full_analysis_json(self, manual_hoog=None, manual_laag=None):
         return {
@@ -126,14 +395,16 @@ class EnergyCalculator:
             'results': self.calculate(manual_hoog, manual_laag)
         }
 
-    def get_daily_usage_for_month(self, month):
-        df_month = self.df[self.df.index.month == month]
-        daily = df_month.groupby(df_month.index.date).agg({
-            'consumption_interval': 'sum',
-            'return_interval': 'sum'
-        })
-        return [{
-            'date': str(index),
-            'verbruik': round(row['consumption_interval'], 3),
-            'teruglevering': round(row['return_interval'], 3)
-        } for index, row in daily.iterrows()]
\ No newline at end of file
+    def get_daily_usage_for_month(self, month, year=None):
+        """Dagtotalen binnen één maand; zonder jaar wordt het laatste jaar met data voor die maand gebruikt."""
+        year = year or self.rollups.latest_year(month)
+        if year is None: return []
+        return self.rollups.daily_for_month(year, month)
+
+    def get_usage(self, start=None, end=None, resolution=None):
+        """Verbruik/teruglevering voor een willekeurig venster [start, end); geeft `(punten, resolutie)`.
+
+        Zonder `resolution` kiest `query_usage` de fijnste die binnen het puntenmaximum blijft.
+        """
+        with stage('usage_query'):
+            return query_usage(self.store, start, end, resolution)
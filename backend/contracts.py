@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+from dataset_cache import load_by_mtime
+
+# Vaste leveringskosten per maand zoals de calculator die rekent
+VASTE_KOSTEN_MAAND = 7.0
+
+def to_float(column):
+    """Zet een kolom met komma-decimalen ('0,230') in één keer om naar float64."""
+    return pd.to_numeric(column.astype(str).str.replace(',', '.', regex=False), errors='coerce').to_numpy(dtype='float64')
+
+
+class ContractCatalog:
+    """Contractcatalogus als getypeerde arrays, één positie per contract."""
+
+    def __init__(self, ids, providers, contracts, normaal, dal, extra_kosten, jaren):
+        self.ids = ids
+        self.providers = providers
+        self.contracts = contracts
+        self.normaal = normaal
+        self.dal = dal
+        self.extra_kosten = extra_kosten
+        self.jaren = jaren
+        self.types = np.where(np.char.find(contracts.astype(str), 'Vast') >= 0, 'Vast', 'Variabel')
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_csv(cls, path):
+        df = pd.read_csv(path)
+        ids = df['id'].astype(str) if 'id' in df.columns else pd.Series([f"fix-{i}" for i in range(len(df))])
+        jaren = to_float(df['Aantal jaar']) if 'Aantal jaar' in df.columns else np.full(len(df), np.nan)
+        return cls(
+            ids=ids.to_numpy(dtype=object),
+            providers=df['Energieleverancier'].to_numpy(dtype=object),
+            contracts=df['Contract'].astype(str).to_numpy(dtype=object),
+            normaal=to_float(df['Normaal']),
+            dal=to_float(df['Dal']),
+            extra_kosten=to_float(df['Extra Kosten']),
+            jaren=jaren
+        )
+
+
+def load_catalog(path):
+    """Laadt de catalogus één keer per bestandsversie (mtime) en deelt hem tussen requests."""
+    return load_by_mtime(path, ContractCatalog.from_csv)
+
+
+class ScenarioComparison:
+    """Jaarkosten per (scenario, contract) met per scenario een ranking van goedkoop naar duur."""
+
+    def __init__(self, catalog, usage, returned, share_normaal, yearly):
+        self.catalog = catalog
+        self.usage = usage
+        self.returned = returned
+        self.share_normaal = share_normaal
+        self.yearly = yearly
+        self.order = np.argsort(yearly, axis=1, kind='stable')
+
+    def best(self):
+        """Index van het goedkoopste contract per scenario."""
+        return self.order[:, 0]
+
+    def ranked(self, scenario, top=None):
+        idx = self.order[scenario][:top]
+        cat = self.catalog
+        return [{
+            'id': str(cat.ids[i]),
+            'provider': cat.providers[i],
+            'contract': cat.contracts[i],
+            'type': str(cat.types[i]),
+            'years': None if np.isnan(cat.jaren[i]) else int(cat.jaren[i]),
+            'rank': rank + 1,
+            'monthlyCost': round(float(self.yearly[scenario, i]) / 12, 2),
+            'yearlyCost': round(float(self.yearly[scenario, i]), 2)
+        } for rank, i in enumerate(idx)]
+
+
+def compare_scenarios(catalog, usage, returned, share_normaal, eb_per_kwh, netbeheer_jaar):
+    """Rekent alle contracten × alle scenario's in één broadcast door.
+
+    `usage`, `returned` en `share_normaal` zijn arrays van lengte S (of scalars);
+    het resultaat bevat een S×C matrix met jaarkosten. Salderen: het netto
+    verbruik (minimaal 0) wordt naar rato over normaal en dal verdeeld.
+    """
+    usage = np.atleast_1d(np.asarray(usage, dtype='float64'))
+    returned = np.broadcast_to(np.asarray(returned, dtype='float64'), usage.shape)
+    share = np.broadcast_to(np.asarray(share_normaal, dtype='float64'), usage.shape)
+
+    netto = np.maximum(0.0, usage - returned)[:, None]
+    p_gemiddeld = share[:, None] * catalog.normaal[None, :] + (1 - share[:, None]) * catalog.dal[None, :]
+    yearly = netto * (p_gemiddeld + eb_per_kwh) + VASTE_KOSTEN_MAAND * 12 + netbeheer_jaar
+    return ScenarioComparison(catalog, usage, returned, share, yearly)
@@ -0,0 +1,135 @@
+import os
+import threading
+from collections import OrderedDict
+
+
+def file_version(path, companions=()):
+    """(mtime, grootte) van `path` en van elke companion (None als die nog niet bestaat)."""
+    st = os.stat(path)
+    version = [(st.st_mtime_ns, st.st_size)]
+    for companion in companions:
+        try:
+            st = os.stat(companion)
+            version.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            version.append(None)
+    return tuple(version)
+
+
+class DatasetCache:
+    """Thread-safe LRU-cache van geshapete datasets, per bestand + mtime + grootte.
+
+    Naast het bronbestand kunnen `companions` (bijv. een append-log) meetellen in de
+    versie; wijzigt één van die bestanden, dan is de entry verouderd.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (dataset, nbytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def _key(self, path, variant=None, companions=()):
+        return (os.path.abspath(path), file_version(path, companions), variant)
+
+    @staticmethod
+    def _sizeof(dataset):
+        if hasattr(dataset, 'memory_usage'):
+            return int(dataset.memory_usage(index=True, deep=True).sum())
+        return int(getattr(dataset, 'nbytes', 0))
+
+    def get(self, path, loader, variant=None, companions=()):
+        """Geeft de dataset voor `path`; roept `loader()` alleen aan bij een miss.
+
+        `variant` onderscheidt datasets die uit hetzelfde bestand met andere instellingen
+        zijn afgeleid (bijv. een andere tariefkalender).
+        """
+        key = self._key(path, variant, companions)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Eén lader per key; gelijktijdige requests wachten op hetzelfde resultaat
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                self.misses += 1
+
+            dataset = loader()
+            with self._lock:
+                self._load_locks.pop(key, None)
+                self._store(key, dataset)
+            return dataset
+
+    def put(self, path, dataset, variant=None, companions=()):
+        """Zet een (incrementeel bijgewerkte) dataset direct onder de huidige bestandsversie."""
+        key = self._key(path, variant, companions)
+        with self._lock:
+            self._store(key, dataset)
+
+    def _store(self, key, dataset):
+        # Oude versies van hetzelfde bestand zijn verouderd zodra mtime/grootte wijzigt
+        for stale in [k for k in self._entries if k[0] == key[0] and k[1] != key[1]]:
+            self._bytes -= self._entries.pop(stale)[1]
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[1]
+        nbytes = self._sizeof(dataset)
+        self._entries[key] = (dataset, nbytes)
+        self._bytes += nbytes
+        self._evict()
+
+    def _evict(self):
+        # De laatst toegevoegde entry blijft altijd staan, ook als die alleen al te groot is
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self._bytes -= nbytes
+
+    def invalidate(self, path=None):
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            abspath = os.path.abspath(path)
+            for stale in [k for k in self._entries if k[0] == abspath]:
+                self._bytes -= self._entries.pop(stale)[1]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes
+            }
+
+
+_file_cache = {}
+_file_cache_lock = threading.Lock()
+
+
+def load_by_mtime(path, loader):
+    """Laadt kleine referentiebestanden (catalogus, prijzen) één keer per bestandsversie."""
+    key = (os.path.abspath(path), loader)
+    mtime = os.stat(path).st_mtime_ns
+    with _file_cache_lock:
+        cached = _file_cache.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+    value = loader(path)
+    with _file_cache_lock:
+        _file_cache[key] = (mtime, value)
+    return value
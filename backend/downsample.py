@@ -0,0 +1,42 @@
+import numpy as np
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: indices van `threshold` punten die de vorm behouden.
+
+    `x` moet oplopend zijn (datetime64 mag; die wordt als int64 gelezen). Eerste en
+    laatste punt blijven altijd staan; per tussenliggende bucket wordt het punt
+    gekozen dat de grootste driehoek vormt met het vorige gekozen punt en het
+    gemiddelde van de volgende bucket. Pieken en dalen blijven zo zichtbaar, in
+    tegenstelling tot gemiddelden per bucket.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype('int64')
+    x = x.astype('float64')
+    y = np.asarray(y, dtype='float64')
+
+    # Bucketgrenzen over de punten tussen het eerste en laatste; gemiddelden via prefixsommen
+    edges = np.floor(np.linspace(1, n - 1, threshold - 1)).astype('int64')
+    cum_x = np.concatenate([[0.0], np.cumsum(x)])
+    cum_y = np.concatenate([[0.0], np.cumsum(y)])
+
+    selected = np.empty(threshold, dtype='int64')
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            nlo, nhi = hi, edges[i + 2]
+            avg_x = (cum_x[nhi] - cum_x[nlo]) / (nhi - nlo)
+            avg_y = (cum_y[nhi] - cum_y[nlo]) / (nhi - nlo)
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
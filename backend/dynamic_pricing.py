@@ -0,0 +1,117 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from contracts import to_float
+from dataset_cache import load_by_mtime
+
+BTW = 1.21
+
+
+class PriceStore:
+    """EPEX day-ahead prijzen (EUR/kWh, excl. BTW) op een gesorteerde UTC-tijdas."""
+
+    def __init__(self, ts_ns, price):
+        order = np.argsort(ts_ns, kind='stable')
+        self.ts_ns = np.asarray(ts_ns, dtype='int64')[order]
+        self.price = np.asarray(price, dtype='float64')[order]
+        # Resolutie van de prijsreeks (uur, of kwartier bij nieuwere exports)
+        steps = np.diff(self.ts_ns)
+        self.step_ns = int(np.median(steps)) if len(steps) else 3600 * 10**9
+
+    def __len__(self):
+        return len(self.ts_ns)
+
+    @classmethod
+    def from_csv(cls, path):
+        df = pd.read_csv(path, usecols=['Datetime (UTC)', 'Price (EUR/MWhe)'])
+        ts = pd.to_datetime(df['Datetime (UTC)'], utc=True, errors='coerce')
+        price = pd.to_numeric(df['Price (EUR/MWhe)'], errors='coerce') / 1000
+        valid = ts.notna() & price.notna()
+        return cls(ts[valid].dt.as_unit('ns').astype('int64').to_numpy(), price[valid].to_numpy())
+
+    def align_ns(self, ts):
+        """Prijs per interval op UTC-epoch in nanoseconden (bijv. `IntervalStore.ts`); NaN waar geen prijs bekend is."""
+        if len(self.ts_ns) == 0:
+            return np.full(len(ts), np.nan)
+        pos = np.searchsorted(self.ts_ns, ts, side='right') - 1
+        valid = pos >= 0
+        pos = np.maximum(pos, 0)
+        valid &= (ts - self.ts_ns[pos]) < self.step_ns
+        return np.where(valid, self.price[pos], np.nan)
+
+
+def load_price_store(path):
+    """Laadt de prijsreeks één keer per bestandsversie en deelt hem tussen requests."""
+    return load_by_mtime(path, PriceStore.from_csv)
+
+
+class DynamicContracts:
+    """Dynamische contracten: inkoopopslag per kWh (excl. BTW) en vaste kosten per maand."""
+
+    def __init__(self, providers, opslag, extra_kosten):
+        self.providers = providers
+        self.opslag = opslag
+        self.extra_kosten = extra_kosten
+
+    def __len__(self):
+        return len(self.providers)
+
+    @classmethod
+    def from_csv(cls, path):
+        """Leest `Energieleverancier`, `Opslag` en `Extra Kosten` (komma-decimalen toegestaan).
+
+        Een catalogus in het formaat van `contracten_energie` wordt gefilterd op
+        `Contract == 'Dynamisch'`; de kolom `Opslag` is dan wel verplicht.
+        """
+        df = pd.read_csv(path)
+        if 'Contract' in df.columns:
+            df = df[df['Contract'].astype(str).str.strip() == 'Dynamisch']
+        if 'Opslag' not in df.columns:
+            raise ValueError(f"Kolom 'Opslag' ontbreekt in {os.path.basename(path)}")
+        extra = to_float(df['Extra Kosten']) if 'Extra Kosten' in df.columns else np.zeros(len(df))
+        return cls(df['Energieleverancier'].to_numpy(dtype=object), to_float(df['Opslag']), extra)
+
+
+def load_dynamic_contracts(path):
+    return load_by_mtime(path, DynamicContracts.from_csv)
+
+
+def price_dynamic_contracts(ts_ns, consumption, returned, store, contracts, eb_per_kwh, netbeheer_jaar,
+                            yearly_usage=None, yearly_return=None):
+    """Kosten van alle dynamische contracten over de meterperiode, in één gevectoriseerde pass.
+
+    Levering kost per interval (EPEX + opslag) × BTW; teruglevering wordt vergoed tegen
+    EPEX × BTW. Energiebelasting wordt gesaldeerd over het netto verbruik. Omdat de
+    opslag per kWh constant is, volstaan twee dot-producten voor de hele catalogus.
+    `ts_ns` is de UTC-epoch (ns) per interval; intervallen zonder bekende prijs tellen
+    niet mee. Met `yearly_usage` en `yearly_return` wordt het geprijsde profiel
+    opgeschaald naar een jaarschatting.
+    """
+    price = store.align_ns(ts_ns)
+    priced = ~np.isnan(price)
+    cons = np.where(priced, consumption, 0.0)
+    ret = np.where(priced, returned, 0.0)
+    epex = np.where(priced, price, 0.0)
+
+    cons_kwh = cons.sum()
+    ret_kwh = ret.sum()
+    scale_cons = yearly_usage / cons_kwh if yearly_usage is not None and cons_kwh > 0 else 1.0
+    scale_ret = yearly_return / ret_kwh if yearly_return is not None and ret_kwh > 0 else 1.0
+
+    cons_kwh *= scale_cons
+    ret_kwh *= scale_ret
+    cons_epex = cons.dot(epex) * scale_cons
+    ret_epex = ret.dot(epex) * scale_ret
+
+    levering = (cons_epex + contracts.opslag * cons_kwh) * BTW
+    vergoeding = ret_epex * BTW
+    energiebelasting = max(0.0, cons_kwh - ret_kwh) * eb_per_kwh
+    yearly = levering - vergoeding + energiebelasting + contracts.extra_kosten * 12 + netbeheer_jaar
+    return {
+        'yearly': yearly,
+        'priced_intervals': int(priced.sum()),
+        'total_intervals': int(len(price)),
+        'avg_price': float(cons_epex / cons_kwh) if cons_kwh > 0 else None
+    }
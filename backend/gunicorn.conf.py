@@ -0,0 +1,28 @@
+"""Gunicorn-configuratie voor productie; instelbaar via omgevingsvariabelen.
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+"""
+import os
+
+bind = os.getenv('BIND', '0.0.0.0:5001')
+
+# Rekenwerk is CPU-gebonden: één proces per core, een paar threads per worker
+# zodat een trage request (bijv. een batterij-sweep) de rest niet ophoudt
+workers = int(os.getenv('WEB_CONCURRENCY', os.cpu_count() or 1))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+
+# Datasets in de master laden en delen (zie wsgi.py); GUNICORN_PRELOAD=0 laadt per worker
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') != '0'
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = 30
+keepalive = 5
+
+# Workers periodiek vervangen; een nieuwe fork deelt de vooraf geladen data weer met de master
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = max_requests // 10
+
+# Leeg laten (GUNICORN_ACCESS_LOG=) schakelt de access log uit
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
@@ -0,0 +1,170 @@
+import glob
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Verhoog bij een wijziging van het sidecar-formaat; oude bestanden worden dan genegeerd
+SIDECAR_VERSION = 4
+SIDECAR_DTYPE = np.dtype([('ts', '<i8'), ('cons', '<f4'), ('ret', '<f4')])
+TIMEZONE = 'Europe/Amsterdam'
+
+
+def source_key(input_path):
+    st = os.stat(input_path)
+    return f"{st.st_mtime_ns}-{st.st_size}"
+
+
+def sidecar_path(input_path, key=None):
+    """Pad van de binaire sidecar; mtime en grootte van de bron zitten in de naam."""
+    key = key or source_key(input_path)
+    return f"{input_path}.{key}.v{SIDECAR_VERSION}.shaped.npy"
+
+
+def quality_path(sidecar):
+    """Kwaliteitsoverzicht van de ingest, naast de sidecar waar het bij hoort."""
+    return f"{sidecar}.quality.json"
+
+
+def frame_from_arrays(ts_ns, consumption, returned):
+    """Bouwt het geshapete frame (NL-tijd index, float64 kolommen) uit ruwe arrays."""
+    index = pd.DatetimeIndex(pd.to_datetime(np.asarray(ts_ns, dtype='int64'), utc=True))
+    index = index.tz_convert(TIMEZONE).rename('timestamp')
+    return pd.DataFrame({
+        'consumption_interval': np.asarray(consumption, dtype='float64'),
+        'return_interval': np.asarray(returned, dtype='float64')
+    }, index=index)
+
+
+def records_from_frame(df):
+    data = np.empty(len(df), dtype=SIDECAR_DTYPE)
+    data['ts'] = df.index.tz_convert('UTC').as_unit('ns').asi8
+    data['cons'] = df['consumption_interval'].to_numpy()
+    data['ret'] = df['return_interval'].to_numpy()
+    return data
+
+
+def load_sidecar(input_path):
+    """Opent de sidecar via mmap als die bij de huidige versie van de bron hoort, anders None."""
+    path = sidecar_path(input_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        data = np.load(path, mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+    if data.dtype != SIDECAR_DTYPE:
+        return None
+    df = frame_from_arrays(data['ts'], data['cons'], data['ret'])
+    try:
+        with open(quality_path(path)) as f:
+            df.attrs['quality'] = json.load(f)
+    except (OSError, ValueError):
+        pass
+    return df
+
+
+def write_sidecar(input_path, df, key):
+    """Schrijft het frame atomair weg als sidecar voor bronversie `key`.
+
+    `key` moet vóór het parsen bepaald zijn; als de bron tussentijds is gewijzigd
+    wordt er niets geschreven. Schrijffouten (bijv. read-only map) zijn niet fataal.
+    """
+    if df.empty or source_key(input_path) != key:
+        return None
+
+    data = records_from_frame(df)
+    path = sidecar_path(input_path, key)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        with open(tmp_path, 'wb') as f:
+            np.save(f, data)
+        os.replace(tmp_path, path)
+        if 'quality' in df.attrs:
+            with open(tmp_path, 'w') as f:
+                json.dump(df.attrs['quality'], f)
+            os.replace(tmp_path, quality_path(path))
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+
+    _remove_stale_sidecars(input_path, keep=path)
+    return path
+
+
+def _remove_stale_sidecars(input_path, keep):
+    pattern = f"{glob.escape(input_path)}.*.shaped.npy"
+    for stale in glob.glob(pattern) + glob.glob(quality_path(pattern)):
+        if stale not in (keep, quality_path(keep)):
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+
+def append_log_path(input_path):
+    """Append-log met later geüploade intervallen; records in hetzelfde formaat als de sidecar."""
+    return f"{input_path}.appended.bin"
+
+
+def append_meta_path(input_path):
+    """Bij het append-log: de versie van de basisexport en het kwaliteitsoverzicht na de uploads."""
+    return f"{append_log_path(input_path)}.json"
+
+
+def _read_append_meta(input_path):
+    try:
+        with open(append_meta_path(input_path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def append_to_log(input_path, df, quality=None):
+    """Voegt intervallen achteraan het log toe; kost tijd evenredig met de nieuwe data.
+
+    Moet onder de upload-lock draaien. Een half geschreven record van een afgebroken
+    append wordt eerst afgekapt, anders staat alles erna verschoven. Hoort het log
+    bij een eerdere versie van de export, dan begint het opnieuw.
+    """
+    if df.empty:
+        return
+    key = source_key(input_path)
+    meta = _read_append_meta(input_path)
+    with open(append_log_path(input_path), 'ab') as f:
+        if meta is not None and meta.get('source') != key:
+            f.truncate(0)
+        elif f.tell() % SIDECAR_DTYPE.itemsize:
+            f.truncate(f.tell() - f.tell() % SIDECAR_DTYPE.itemsize)
+        path = append_meta_path(input_path)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, 'w') as meta_file:
+            json.dump({'source': key, 'quality': quality}, meta_file)
+        os.replace(tmp_path, path)
+        f.write(records_from_frame(df).tobytes())
+
+
+def read_append_log(input_path):
+    """Leest het append-log als frame; bij dubbele tijdstempels wint de laatst geschreven waarde.
+
+    Een log van een eerdere versie van de export (die is vervangen) wordt genegeerd.
+    """
+    path = append_log_path(input_path)
+    if not os.path.exists(path):
+        return None
+    meta = _read_append_meta(input_path)
+    if meta is not None and meta.get('source') != source_key(input_path):
+        return None
+    # Een half geschreven record aan het eind (bijv. na een crash) wordt door fromfile genegeerd
+    # en bij de volgende append afgekapt
+    data = np.fromfile(path, dtype=SIDECAR_DTYPE)
+    if len(data) == 0:
+        return None
+    _, last = np.unique(data['ts'][::-1], return_index=True)
+    data = data[len(data) - 1 - last]
+    df = frame_from_arrays(data['ts'], data['cons'], data['ret'])
+    if meta is not None and meta.get('quality') is not None:
+        df.attrs['quality'] = meta['quality']
+    return df
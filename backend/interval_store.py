@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+TIMEZONE = 'Europe/Amsterdam'
+NS_PER_HOUR = 3600 * 10**9
+
+
+class IntervalStore:
+    """Compacte kolomopslag van de kwartierreeks, gesorteerd op tijd.
+
+    Per interval: UTC-epoch (int64, ns), de lokale (NL) kalendervelden als kleine
+    integers, het tarieflabel en verbruik/teruglevering als float32. De tijdzone-
+    conversie gebeurt één keer bij het bouwen; aggregaties daarna groeperen op
+    integer-sleutels zonder datetime-werk.
+    """
+
+    COLUMNS = ('ts', 'year', 'month', 'day', 'hour', 'weekday', 'is_normaal', 'cons', 'ret')
+
+    def __init__(self, ts, year, month, day, hour, weekday, is_normaal, cons, ret):
+        self.ts = ts
+        self.year = year
+        self.month = month
+        self.day = day
+        self.hour = hour
+        self.weekday = weekday
+        self.is_normaal = is_normaal
+        self.cons = cons
+        self.ret = ret
+        # Kwaliteitsoverzicht uit meter_ingest (per reeks), als dat bij het inlezen bekend was
+        self.quality = None
+
+    @classmethod
+    def from_arrays(cls, ts_ns, consumption, returned, is_normaal=None, tariff_calendar=None, local_ns=None):
+        """Bouwt de store uit gesorteerde UTC-tijdstempels (ns) en waarden.
+
+        Zonder `is_normaal` wordt het label met `tariff_calendar` bepaald (of alles dal
+        als die ook ontbreekt). `local_ns` (lokale wandkloktijd) mag meegegeven worden
+        als die al bekend is, anders wordt hij hier één keer berekend.
+        """
+        ts = np.asarray(ts_ns, dtype='int64')
+        if local_ns is None:
+            local_ns = pd.DatetimeIndex(pd.to_datetime(ts, utc=True)).tz_convert(TIMEZONE).tz_localize(None).asi8
+        local = np.asarray(local_ns, dtype='int64').view('M8[ns]')
+        days = local.astype('M8[D]')
+        months = local.astype('M8[M]')
+
+        year = (local.astype('M8[Y]').astype('int64') + 1970).astype('int16')
+        month = (months.astype('int64') % 12 + 1).astype('int8')
+        day = ((days - months.astype('M8[D]')).astype('int64') + 1).astype('int8')
+        hour = (np.asarray(local_ns, dtype='int64') // NS_PER_HOUR % 24).astype('int8')
+        # 1970-01-01 was een donderdag (weekday 3)
+        weekday = ((days.astype('int64') + 3) % 7).astype('int8')
+
+        if is_normaal is None:
+            if tariff_calendar is not None:
+                is_normaal = tariff_calendar.label_fields(year, month, day, hour, weekday)
+            else:
+                is_normaal = np.zeros(len(ts), dtype=bool)
+
+        return cls(ts, year, month, day, hour, weekday, np.asarray(is_normaal, dtype=bool),
+                   np.asarray(consumption, dtype='float32'), np.asarray(returned, dtype='float32'))
+
+    @classmethod
+    def from_frame(cls, df, tariff_calendar=None):
+        """Store uit een geshapet frame (NL-tijd index).
+
+        Een bestaande `is_normaal`-kolom en het kwaliteitsoverzicht in `df.attrs` worden overgenomen.
+        """
+        if df.empty:
+            return cls.empty_store()
+        index = df.index.as_unit('ns')
+        is_normaal = df['is_normaal'].to_numpy(dtype=bool) if 'is_normaal' in df.columns else None
+        store = cls.from_arrays(index.asi8, df['consumption_interval'].to_numpy(), df['return_interval'].to_numpy(),
+                                is_normaal=is_normaal, tariff_calendar=tariff_calendar,
+                                local_ns=index.tz_localize(None).asi8)
+        store.quality = df.attrs.get('quality')
+        return store
+
+    @classmethod
+    def empty_store(cls):
+        return cls.from_arrays(np.zeros(0, dtype='int64'), np.zeros(0), np.zeros(0), local_ns=np.zeros(0, dtype='int64'))
+
+    def __len__(self):
+        return len(self.ts)
+
+    @property
+    def empty(self):
+        return len(self.ts) == 0
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, col).nbytes for col in self.COLUMNS)
+
+    def month_key(self):
+        """yyyymm per interval (lokale tijd)."""
+        return self.year.astype('int64') * 100 + self.month
+
+    def day_key(self):
+        """yyyymmdd per interval (lokale tijd)."""
+        return self.month_key() * 100 + self.day
+
+    def hour_key(self):
+        """yyyymm*100 + uur van de dag; sleutel van de uur-rollup."""
+        return self.month_key() * 100 + self.hour
+
+    def local_dates(self):
+        """Lokale datum per interval als datetime64[D], zonder pandas-tijdzonewerk."""
+        months = (self.year.astype('int64') - 1970) * 12 + self.month - 1
+        return months.astype('M8[M]').astype('M8[D]') + (self.day.astype('int64') - 1)
+
+    def searchsorted(self, ts_ns, side='left'):
+        return int(np.searchsorted(self.ts, ts_ns, side=side))
+
+    def slice(self, start, stop):
+        """Deelstore over [start, stop); de arrays zijn views op het origineel."""
+        return IntervalStore(*(getattr(self, col)[start:stop] for col in self.COLUMNS))
+
+    def take(self, indexer):
+        """Deelstore met de rijen uit `indexer` (boolean masker of posities); kopieert de arrays."""
+        return IntervalStore(*(getattr(self, col)[indexer] for col in self.COLUMNS))
+
+    @classmethod
+    def concat(cls, stores):
+        """Plakt stores achter elkaar; de aanroeper zorgt dat de tijdvolgorde klopt."""
+        return cls(*(np.concatenate([getattr(store, col) for store in stores]) for col in cls.COLUMNS))
+
+    def local_index(self):
+        """Tijdzonebewuste (NL) index; alleen voor output, niet voor aggregaties."""
+        return pd.DatetimeIndex(pd.to_datetime(self.ts, utc=True)).tz_convert(TIMEZONE).rename('timestamp')
+
+    def to_frame(self):
+        """Het geshapete frame zoals de rest van de backend het kent (float64 kolommen)."""
+        return pd.DataFrame({
+            'consumption_interval': self.cons.astype('float64'),
+            'return_interval': self.ret.astype('float64'),
+            'is_normaal': self.is_normaal
+        }, index=self.local_index())
@@ -0,0 +1,218 @@
+"""Gedeelde ingest-stap: ruwe meterreeks naar kwartierwaarden op een regelmatig raster.
+
+Herkent of een reeks een cumulatieve telwerkstand of al een verbruik per interval
+is, rekent telwerkstanden om (met resets), legt kwartierdata op het 15-minutenraster
+en meldt gaten, die optioneel worden opgevuld. Reeksen met een andere stap (uur,
+dag) houden hun eigen tijdstempels. Alles werkt op numpy-arrays met
+UTC-tijdstempels in ns, zodat meerjarige reeksen in één keer door de stap gaan.
+"""
+import numpy as np
+import pandas as pd
+
+from ingest_cache import frame_from_arrays
+
+INTERVAL_NS = 15 * 60 * 10**9
+# Afwijking van de mediane stap waarbinnen een reeks als kwartierdata op het raster gaat
+STEP_TOLERANCE_NS = 60 * 10**9
+KINDS = ('auto', 'register', 'interval')
+
+# Een telwerk daalt alleen bij een reset; bij meer dalende stappen is het intervaldata
+REGISTER_MAX_DROP_SHARE = 0.01
+# Een telwerkstand is veel groter dan een kwartierstap; intervaldata ligt in dezelfde orde
+REGISTER_MIN_LEVEL_RATIO = 10
+# Minder metingen (één dag kwartieren) zijn te weinig om een telwerk van stijgend verbruik te onderscheiden
+REGISTER_MIN_READINGS = 96
+# Langste gat in intervaldata dat bij opvullen lineair geïnterpoleerd wordt (4 uur)
+MAX_FILL_INTERVALS = 16
+
+
+def detect_kind(values):
+    """'register' als de reeks een oplopende telwerkstand is, anders 'interval'.
+
+    Korte reeksen gelden altijd als intervaldata; een paar oplopende kwartierwaarden
+    lijken anders al snel op een telwerk.
+    """
+    values = np.asarray(values, dtype='float64')
+    values = values[~np.isnan(values)]
+    if len(values) < REGISTER_MIN_READINGS:
+        return 'interval'
+    steps = np.diff(values)
+    rising = steps[steps > 0]
+    if len(rising) == 0:
+        return 'interval'
+    if np.count_nonzero(steps < 0) > REGISTER_MAX_DROP_SHARE * len(steps):
+        return 'interval'
+    return 'register' if np.median(values) > REGISTER_MIN_LEVEL_RATIO * np.median(rising) else 'interval'
+
+
+def _missing_runs(values):
+    """Begin en lengte van elke aaneengesloten reeks NaN's."""
+    edges = np.diff(np.concatenate([[0], np.isnan(values).astype('int8'), [0]]))
+    starts = np.flatnonzero(edges == 1)
+    return starts, np.flatnonzero(edges == -1) - starts
+
+
+def native_step(ts_ns):
+    """Mediane stap in ns tussen opeenvolgende unieke tijdstempels; een kwartier bij minder dan twee."""
+    steps = np.diff(np.unique(np.asarray(ts_ns, dtype='int64')))
+    return int(np.median(steps)) if len(steps) else INTERVAL_NS
+
+
+def gap_summary(ts_ns, step_ns=None):
+    """Gaten in een gesorteerde reeks tijdstempels: verwachte en ontbrekende intervallen.
+
+    Geteld in `step_ns`, standaard de eigen (mediane) stap van de reeks. Stappen
+    worden afgerond, zodat de 23- en 25-uursdagen rond de zomertijd geen gat zijn.
+    """
+    ts = np.asarray(ts_ns, dtype='int64')
+    step = native_step(ts) if step_ns is None else int(step_ns)
+    if len(ts) == 0:
+        return {'step_minutes': step / 6e10, 'expected_intervals': 0, 'missing_intervals': 0, 'gaps': 0,
+                'largest_gap_hours': 0.0, 'coverage': 0.0}
+    steps = np.rint(np.diff(ts) / step).astype('int64')
+    skipped = steps[steps > 1] - 1
+    expected = int(np.rint((ts[-1] - ts[0]) / step)) + 1
+    return {
+        'step_minutes': step / 6e10,
+        'expected_intervals': expected,
+        'missing_intervals': int(skipped.sum()),
+        'gaps': int(len(skipped)),
+        'largest_gap_hours': float(skipped.max()) * step / 3.6e12 if len(skipped) else 0.0,
+        'coverage': round(len(ts) / expected, 4),
+    }
+
+
+def to_intervals(ts_ns, values, kind='auto', fill_gaps=False, max_fill=MAX_FILL_INTERVALS):
+    """Zet één meterreeks om naar kWh per kwartier op het raster, plus een kwaliteitsoverzicht.
+
+    Tijdstempels worden op het dichtstbijzijnde kwartier gelegd; bij dubbele wint de
+    laatste meting. Dat geldt alleen als de reeks zelf per kwartier meet (mediane
+    stap); uur- of dagdata houdt zijn tijdstempels en wordt niet opgevuld, anders
+    zou een uurwaarde over vier kwartieren verdeeld of viermaal geteld worden.
+
+    Een telwerkstand levert per interval het verschil met de volgende stand,
+    gelabeld op het begin van het interval. Een daling is een reset (meterwissel
+    of overloop) en maakt dat interval onbekend in plaats van een piek. Negatieve
+    intervalwaarden worden op nul gezet.
+
+    Met `fill_gaps` wordt een telwerkverschil over een gat gelijk over de gemiste
+    intervallen verdeeld (de energie is bekend, alleen de verdeling niet) en worden
+    gaten tot `max_fill` intervallen lineair geïnterpoleerd. Zonder opvullen blijven
+    ontbrekende intervallen weg en staat een telwerkverschil over een gat op het
+    eerste interval. Geeft (ts_ns, kWh, kwaliteit).
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Onbekend reekstype '{kind}', kies uit {', '.join(KINDS)}")
+    ts = np.asarray(ts_ns, dtype='int64')
+    values = np.asarray(values, dtype='float64')
+    readings = len(ts)
+
+    order = np.argsort(ts, kind='stable')
+    ts, values = ts[order], values[order]
+    step = native_step(ts)
+    on_grid = abs(step - INTERVAL_NS) <= STEP_TOLERANCE_NS
+    if on_grid:
+        slots = np.floor_divide(ts + INTERVAL_NS // 2, INTERVAL_NS)
+        off_grid = int(np.count_nonzero(ts % INTERVAL_NS))
+    else:
+        slots, off_grid = ts, 0
+    # Laatste meting per kwartier (of per tijdstempel buiten het raster) wint
+    last = np.ones(len(slots), dtype=bool)
+    last[:-1] = slots[1:] != slots[:-1]
+    duplicates = int(len(slots) - np.count_nonzero(last))
+    slots, values = slots[last], values[last]
+    known = ~np.isnan(values)
+    slots, values = slots[known], values[known]
+
+    if kind == 'auto':
+        kind = detect_kind(values)
+
+    # Laatste telwerkstand; een latere upload rekent het interval erna vanaf deze stand
+    last_reading = None
+    if kind == 'register' and len(values):
+        last_reading = {'ts': int(slots[-1] * INTERVAL_NS if on_grid else slots[-1]), 'value': float(values[-1])}
+
+    resets = negatives = spread = 0
+    if kind == 'register' and len(values) > 1:
+        deltas = np.diff(values)
+        drop = deltas < 0
+        resets = int(np.count_nonzero(drop))
+        deltas[drop] = np.nan
+        span = np.diff(slots)
+        if fill_gaps and on_grid:
+            spread = int(span[span > 1].sum())
+            values = np.repeat(deltas / span, span)
+            slots = slots[0] + np.arange(len(values))
+        else:
+            values, slots = deltas, slots[:-1]
+    elif kind == 'register':
+        values, slots = values[:0], slots[:0]
+    else:
+        negatives = int(np.count_nonzero(values < 0))
+        values = np.maximum(values, 0.0)
+
+    filled = 0
+    if not on_grid:
+        present = ~np.isnan(values)
+        out_ts, out_values = slots[present], values[present]
+    else:
+        # Op het volledige raster: ontbrekend (en onbekend na reset) is NaN
+        if len(slots):
+            grid = np.full(int(slots[-1] - slots[0]) + 1, np.nan)
+            grid[slots - slots[0]] = values
+        else:
+            grid = np.zeros(0)
+        starts, lengths = _missing_runs(grid)
+
+        if fill_gaps and len(starts):
+            # Alleen gaten met aan beide kanten een meting; de randen worden niet geëxtrapoleerd
+            fillable = (lengths <= max_fill) & (starts > 0) & (starts + lengths < len(grid))
+            missing = np.flatnonzero(np.isnan(grid))[np.repeat(fillable, lengths)]
+            if len(missing):
+                present = np.flatnonzero(~np.isnan(grid))
+                grid[missing] = np.interp(missing, present, grid[present])
+                filled = len(missing)
+
+        present = ~np.isnan(grid)
+        out_ts = (slots[0] + np.flatnonzero(present)) * INTERVAL_NS if len(slots) else slots * INTERVAL_NS
+        out_values = grid[present]
+
+    return out_ts.astype('int64'), out_values, {
+        'kind': kind,
+        'readings': readings,
+        'intervals': int(len(out_values)),
+        'duplicates': duplicates,
+        'off_grid': off_grid,
+        'resets': resets,
+        'negative_values': negatives,
+        'spread_intervals': spread,
+        'filled_intervals': filled,
+        'last_reading': last_reading,
+        **gap_summary(out_ts, INTERVAL_NS if on_grid else step),
+    }
+
+
+def shaped_frame(consumption, returned, kind='auto', fill_gaps=False, max_fill=MAX_FILL_INTERVALS):
+    """Geshapet frame uit twee ruwe reeksen `(ts_ns, waarden)`, met de kwaliteit in `df.attrs['quality']`.
+
+    Beide reeksen gaan los door `to_intervals`; een kwartier dat maar in één reeks
+    voorkomt krijgt in de andere nul, zoals in de bestaande shaping. `kind` geldt
+    voor beide reeksen, of is een dict per reeks (`'consumption'`, `'return'`),
+    bijvoorbeeld het eerder herkende type bij een upload.
+    """
+    kinds = kind if isinstance(kind, dict) else {'consumption': kind, 'return': kind}
+    cons_ts, cons_val, cons_quality = to_intervals(*consumption, kind=kinds.get('consumption', 'auto'),
+                                                   fill_gaps=fill_gaps, max_fill=max_fill)
+    ret_ts, ret_val, ret_quality = to_intervals(*returned, kind=kinds.get('return', 'auto'),
+                                                fill_gaps=fill_gaps, max_fill=max_fill)
+    ts = np.union1d(cons_ts, ret_ts)
+    if len(ts) == 0:
+        return pd.DataFrame()
+    cons = np.zeros(len(ts))
+    ret = np.zeros(len(ts))
+    cons[np.searchsorted(ts, cons_ts)] = cons_val
+    ret[np.searchsorted(ts, ret_ts)] = ret_val
+
+    df = frame_from_arrays(ts, cons, ret)
+    df.attrs['quality'] = {'consumption': cons_quality, 'return': ret_quality}
+    return df
@@ -0,0 +1,203 @@
+"""Lichtgewicht instrumentatie van de hot paths (duur, rijen en piekgeheugen per stage).
+
+Staat standaard uit; `stage()` geeft dan een gedeeld no-op object terug, zodat
+de instrumentatie in de calculator vrijwel niets kost. Aanzetten met
+`METRICS_ENABLED=1`, piekgeheugen (via tracemalloc, merkbaar duurder) met
+`METRICS_TRACE_MEMORY=1`.
+"""
+import bisect
+import os
+import threading
+import time
+import tracemalloc
+
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROWS_BUCKETS = (10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+BYTES_BUCKETS = tuple(2 ** p for p in range(16, 34, 2))  # 64 KiB .. 8 GiB
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets, label):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.label = label
+        self._series = {}  # labelwaarde -> [bucket-aantallen..., som, aantal]
+        self._lock = threading.Lock()
+
+    def observe(self, label_value, value):
+        pos = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [0] * (len(self.buckets) + 2)
+            if pos < len(self.buckets):
+                series[pos] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for label_value, series in items:
+            label = f'{self.label}="{label_value}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound:g}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {series[-1]}')
+            lines.append(f'{self.name}_sum{{{label}}} {series[-2]:.6f}')
+            lines.append(f'{self.name}_count{{{label}}} {series[-1]}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, label):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_value, amount=1):
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(f'{self.name}{{{self.label}="{k}"}} {v}' for k, v in items)
+        return lines
+
+
+STAGE_SECONDS = Histogram('energy_stage_duration_seconds', 'Duur per stage van de calculator', DURATION_BUCKETS, 'stage')
+STAGE_ROWS = Histogram('energy_stage_rows', 'Verwerkte rijen per stage', ROWS_BUCKETS, 'stage')
+STAGE_PEAK_BYTES = Histogram('energy_stage_peak_alloc_bytes', 'Piekallocatie per stage (tracemalloc)',
+                             BYTES_BUCKETS, 'stage')
+REQUEST_SECONDS = Histogram('energy_request_duration_seconds', 'Duur per Flask-route', DURATION_BUCKETS, 'route')
+REQUEST_ERRORS = Counter('energy_request_errors_total', 'Onafgevangen fouten per Flask-route', 'route')
+
+_local = threading.local()
+
+
+class _NullStage:
+    """Gedeeld no-op object voor als metrics uit staan."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set_rows(self, rows):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+        self.peak = 0
+
+    def set_rows(self, rows):
+        self.rows = rows
+
+    def __enter__(self):
+        if _trace_memory:
+            stack = _stage_stack()
+            if stack:
+                # Piek tot nu toe doorgeven aan de omliggende stage voordat we resetten
+                stack[-1].peak = max(stack[-1].peak, tracemalloc.get_traced_memory()[1] - stack[-1].mem_start)
+            stack.append(self)
+            self.mem_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        STAGE_SECONDS.observe(self.name, elapsed)
+        if self.rows is not None:
+            STAGE_ROWS.observe(self.name, self.rows)
+        if _trace_memory:
+            stack = _stage_stack()
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1] - self.mem_start)
+            STAGE_PEAK_BYTES.observe(self.name, self.peak)
+            stack.pop()
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, self.peak + self.mem_start - stack[-1].mem_start)
+        timings = getattr(_local, 'timings', None)
+        if timings is not None:
+            timings.append((self.name, elapsed))
+        return False
+
+
+def _stage_stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+_enabled = False
+_trace_memory = False
+
+
+def configure(enabled=None, trace_memory=None):
+    """Zet metrics aan/uit; zonder argumenten worden de omgevingsvariabelen gelezen."""
+    global _enabled, _trace_memory
+    _enabled = os.getenv('METRICS_ENABLED', '0') == '1' if enabled is None else enabled
+    _trace_memory = _enabled and (os.getenv('METRICS_TRACE_MEMORY', '0') == '1' if trace_memory is None else trace_memory)
+    if _trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def enabled():
+    return _enabled
+
+
+def stage(name, rows=None):
+    """Context manager rond een stage; `rows` kan ook later via `set_rows` gezet worden."""
+    if not _enabled:
+        return _NULL_STAGE
+    return _Stage(name, rows)
+
+
+def start_request():
+    """Begin met het verzamelen van stage-tijden voor de Server-Timing header van dit request."""
+    if _enabled:
+        _local.timings = []
+        _local.request_start = time.perf_counter()
+
+
+def end_request(route, failed=False):
+    """Registreert de route-duur en geeft de stage-tijden van dit request terug."""
+    timings = getattr(_local, 'timings', None)
+    if timings is None:
+        return []
+    elapsed = time.perf_counter() - _local.request_start
+    REQUEST_SECONDS.observe(route, elapsed)
+    if failed:
+        REQUEST_ERRORS.inc(route)
+    _local.timings = None
+    return timings + [('total', elapsed)]
+
+
+def server_timing_header(timings):
+    """Server-Timing header, bijv. `parse_json;dur=12.3, tariff_labels;dur=1.1`."""
+    return ', '.join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings)
+
+
+def render_prometheus():
+    lines = []
+    for metric in (STAGE_SECONDS, STAGE_ROWS, STAGE_PEAK_BYTES, REQUEST_SECONDS, REQUEST_ERRORS):
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+configure()
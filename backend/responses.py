@@ -0,0 +1,103 @@
+"""Snelle JSON-responses met ETag/conditional GET en compressie.
+
+orjson (indien geïnstalleerd) serialiseert NumPy-arrays en -scalars direct naar
+bytes; zonder orjson valt `dumps` terug op de stdlib. Grote responses worden met
+brotli (als het `brotli`-pakket aanwezig is) of gzip gecomprimeerd.
+"""
+import glob
+import gzip
+import hashlib
+import json
+import os
+
+import numpy as np
+from flask.json.provider import DefaultJSONProvider
+
+import metrics
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Kleine responses passen toch in één pakket; comprimeren kost dan alleen CPU
+COMPRESS_MIN_BYTES = 1024
+ENCODING_SUFFIXES = {'br': '-br', 'gzip': '-gz'}
+
+# Een nieuwe versie van de code kan andere uitkomsten geven, ook bij dezelfde data
+_BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+CODE_VERSION = tuple(sorted((os.path.basename(p), os.stat(p).st_mtime_ns)
+                            for p in glob.glob(os.path.join(_BACKEND_DIR, '*.py'))))
+
+
+def _default(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Type {type(obj).__name__} is niet JSON-serialiseerbaar")
+
+
+def dumps(obj):
+    """Serialiseert naar UTF-8 bytes met gesorteerde sleutels, net als Flask's `jsonify`."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS)
+    return json.dumps(obj, default=_default, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON-provider die `jsonify` via `dumps` laat lopen en als stage 'jsonify' meet."""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        with metrics.stage('jsonify'):
+            body = dumps(obj)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def make_etag(*parts):
+    """Sterke ETag over datasetversie, codeversie en requestparameters."""
+    return hashlib.blake2b(repr((CODE_VERSION,) + parts).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def is_not_modified(request, etag):
+    """True als de client deze versie al heeft, ook als hij eerder de gecomprimeerde variant kreeg."""
+    if request.if_none_match.star_tag:
+        return True
+    candidates = {etag} | {etag + suffix for suffix in ENCODING_SUFFIXES.values()}
+    return any(tag in candidates for tag in request.if_none_match.as_set(include_weak=True))
+
+
+def compress(response, accept_encodings):
+    """Comprimeert grote JSON-responses; de ETag krijgt een suffix per encoding."""
+    if (response.status_code != 200 or response.direct_passthrough or response.mimetype != 'application/json'
+            or 'Content-Encoding' in response.headers):
+        return response
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    with metrics.stage('compress', rows=len(body)):
+        if brotli is not None and accept_encodings.quality('br') > 0:
+            encoding, body = 'br', brotli.compress(body, quality=5)
+        elif accept_encodings.quality('gzip') > 0:
+            encoding, body = 'gzip', gzip.compress(body, compresslevel=6, mtime=0)
+        else:
+            return response
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(etag + ENCODING_SUFFIXES[encoding], weak)
+    return response
@@ -0,0 +1,135 @@
+import copy
+
+import numpy as np
+
+VALUE_COLUMNS = ('cons', 'ret', 'normaal', 'count')
+
+
+class _Rollup:
+    """Sommen en aantallen per gesorteerde integer-sleutel, met per maand een aaneengesloten slice.
+
+    Updates vervangen de arrays in plaats van ze te muteren, zodat een (ondiepe)
+    kopie veilig door lopende requests gelezen kan worden.
+    """
+
+    def __init__(self, key_divisor):
+        # sleutel // key_divisor geeft de maand (yyyymm)
+        self.key_divisor = key_divisor
+        self.keys = np.zeros(0, dtype='int64')
+        self.cons = np.zeros(0)
+        self.ret = np.zeros(0)
+        self.normaal = np.zeros(0)
+        self.count = np.zeros(0, dtype='int64')
+        self._months = {}
+
+    @property
+    def nbytes(self):
+        return self.keys.nbytes + sum(getattr(self, col).nbytes for col in VALUE_COLUMNS)
+
+    def add(self, keys, values, sign=1):
+        """Telt `values` (dict per kolom in VALUE_COLUMNS) per sleutel op bij de bestaande sommen."""
+        merged, inverse = np.unique(np.concatenate([self.keys, keys]), return_inverse=True)
+        size = len(merged)
+        for col in VALUE_COLUMNS:
+            weights = np.concatenate([getattr(self, col), sign * np.asarray(values[col], dtype='float64')])
+            summed = np.bincount(inverse, weights=weights, minlength=size)
+            setattr(self, col, np.rint(summed).astype('int64') if col == 'count' else summed)
+        self.keys = merged
+
+        # Sleutels zonder intervallen (na verwijderen) vallen weg
+        keep = self.count > 0
+        if not keep.all():
+            self.keys = self.keys[keep]
+            for col in VALUE_COLUMNS:
+                setattr(self, col, getattr(self, col)[keep])
+        self._index_months()
+
+    def _index_months(self):
+        months = self.keys // self.key_divisor
+        uniq, starts = np.unique(months, return_index=True)
+        stops = np.append(starts[1:], len(months))
+        self._months = {int(m): slice(int(a), int(b)) for m, a, b in zip(uniq, starts, stops)}
+
+    def month(self, year, month):
+        return self._months.get(year * 100 + month, slice(0, 0))
+
+    def years_with_month(self, month):
+        return sorted(key // 100 for key in self._months if key % 100 == month)
+
+
+class RollupCube:
+    """Voorgeaggregeerde dag- en uurtotalen per (jaar, maand), één keer per dataset berekend.
+
+    Dag-sleutels zijn yyyymmdd, uur-sleutels yyyymm*100 + uur (lokale tijd). Endpoints
+    lezen hieruit met een dict-lookup per maand in plaats van een mask + groupby.
+    """
+
+    def __init__(self):
+        self.daily = _Rollup(key_divisor=100)
+        self.hourly = _Rollup(key_divisor=100)
+
+    def copy(self):
+        cube = RollupCube()
+        cube.daily = copy.copy(self.daily)
+        cube.hourly = copy.copy(self.hourly)
+        return cube
+
+    @property
+    def nbytes(self):
+        return self.daily.nbytes + self.hourly.nbytes
+
+    @classmethod
+    def from_store(cls, store):
+        cube = cls()
+        if not store.empty:
+            cube.update(store)
+        return cube
+
+    def update(self, store, sign=1):
+        """Telt de intervallen van een IntervalStore op (sign=-1 haalt vervangen intervallen er weer af)."""
+        if store.empty:
+            return
+        consumption = store.cons.astype('float64')
+        values = {
+            'cons': consumption,
+            'ret': store.ret.astype('float64'),
+            'normaal': np.where(store.is_normaal, consumption, 0.0),
+            'count': np.ones(len(store))
+        }
+        self.daily.add(store.day_key(), values, sign)
+        self.hourly.add(store.hour_key(), values, sign)
+
+    def totals(self):
+        """Totaal verbruik, teruglevering en verbruik in normaaltarief plus de aanwezige maanden."""
+        months = np.unique(self.daily.keys // 100 % 100)
+        return (float(self.daily.cons.sum()), float(self.daily.ret.sum()),
+                float(self.daily.normaal.sum()), [int(m) for m in months])
+
+    def latest_year(self, month):
+        years = self.daily.years_with_month(month)
+        return years[-1] if years else None
+
+    def daily_for_month(self, year, month):
+        s = self.daily.month(year, month)
+        # Afronden op de hele slice in één keer; tolist() levert direct Python-floats
+        keys = self.daily.keys[s].tolist()
+        cons = np.round(self.daily.cons[s], 3).tolist()
+        ret = np.round(self.daily.ret[s], 3).tolist()
+        return [{
+            'date': f"{k // 10000:04d}-{k // 100 % 100:02d}-{k % 100:02d}",
+            'verbruik': c,
+            'teruglevering': r
+        } for k, c, r in zip(keys, cons, ret)]
+
+    def hourly_means(self, year=None, month=None):
+        """Gemiddelde per interval per uur van de dag, voor één maand of de hele dataset."""
+        if year is not None and month is not None:
+            s = self.hourly.month(year, month)
+        else:
+            s = slice(None)
+        hours = self.hourly.keys[s] % 100
+        cons = np.bincount(hours, weights=self.hourly.cons[s], minlength=24)
+        ret = np.bincount(hours, weights=self.hourly.ret[s], minlength=24)
+        count = np.bincount(hours, weights=self.hourly.count[s], minlength=24)
+        present = np.nonzero(count)[0]
+        return [(int(h), float(cons[h] / count[h]), float(ret[h] / count[h])) for h in present]
@@ -0,0 +1,151 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from meter_ingest import shaped_frame
+
+# Categorie 27 = Verbruik, Categorie 26 = Teruglevering
+CONSUMPTION_CATEGORY = 27
+RETURN_CATEGORY = 26
+
+READ_SIZE = 1 << 20
+CHUNK_RECORDS = 1 << 16
+
+
+class _GrowableArray:
+    """Voorgealloceerde getypeerde array die verdubbelt als hij vol is."""
+
+    def __init__(self, dtype, capacity=CHUNK_RECORDS):
+        self._data = np.empty(capacity, dtype=dtype)
+        self._size = 0
+
+    def extend(self, values):
+        needed = self._size + len(values)
+        if needed > len(self._data):
+            grown = np.empty(max(needed, 2 * len(self._data)), dtype=self._data.dtype)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+        self._data[self._size:needed] = values
+        self._size = needed
+
+    def view(self):
+        return self._data[:self._size]
+
+
+def iter_bundle_records(path, read_size=READ_SIZE):
+    """Loopt één voor één door de records in `energyassetbundles` zonder het hele bestand te laden.
+
+    Alleen de sleutel op het hoogste niveau van het object telt, zoals bij `json.load`;
+    andere waarden worden als geheel overgeslagen, ook als dezelfde sleutel erin staat.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r') as f:
+        buf = ''
+        pos = 0
+        eof = False
+
+        def fill():
+            nonlocal buf, pos, eof
+            chunk = f.read(read_size)
+            if not chunk:
+                eof = True
+            buf, pos = buf[pos:] + chunk, 0
+
+        def peek():
+            """Eerstvolgende teken na witruimte en komma's; '' aan het eind van het bestand."""
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                    pos += 1
+                if pos < len(buf) or eof:
+                    return buf[pos:pos + 1]
+                fill()
+
+        def decode():
+            """JSON-waarde vanaf `pos` (na `peek`); leest bij zolang die over de grens van de chunk loopt."""
+            nonlocal buf, pos
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    fill()
+                    continue
+                # Een getal aan het eind van de buffer kan nog doorlopen
+                if end == len(buf) and not eof:
+                    fill()
+                    continue
+                pos = end
+                if pos > read_size:
+                    buf, pos = buf[pos:], 0
+                return value
+
+        if peek() != '{':
+            return
+        pos += 1
+        # Sleutels van het buitenste object tot `energyassetbundles` met een array
+        while True:
+            if peek() in ('}', ''):
+                return
+            key = decode()
+            if peek() != ':':
+                raise ValueError('Ongeldige JSON: verwacht ":" na een sleutel')
+            pos += 1
+            char = peek()
+            if key == 'energyassetbundles' and char == '[':
+                pos += 1
+                break
+            decode()
+
+        while True:
+            char = peek()
+            if not char:
+                raise ValueError('Onverwacht einde van energyassetbundles')
+            if char == ']':
+                return
+            yield decode()
+
+
+def parse_streaming(path, chunk_records=CHUNK_RECORDS, fill_gaps=False):
+    """Streaming variant van `EnergyCalculator._parse_json` met begrensd geheugengebruik.
+
+    Alleen categorieën 26 en 27 worden bewaard en per chunk in getypeerde arrays
+    opgeslagen, zodat het piekgeheugen meegroeit met de uitvoerreeks en niet met de
+    JSON. Omzetten naar kwartierwaarden gebeurt daarna in `meter_ingest`.
+    """
+    series = {
+        CONSUMPTION_CATEGORY: (_GrowableArray('int64'), _GrowableArray('float64')),
+        RETURN_CATEGORY: (_GrowableArray('int64'), _GrowableArray('float64')),
+    }
+    pending = {cat: ([], []) for cat in series}
+
+    def flush(cat):
+        stamps, values = pending[cat]
+        if not stamps:
+            return
+        ts = pd.to_datetime(stamps, utc=True).as_unit('ns').asi8
+        series[cat][0].extend(ts)
+        series[cat][1].extend(np.asarray(values, dtype='float64'))
+        stamps.clear()
+        values.clear()
+
+    for record in iter_bundle_records(path):
+        if not isinstance(record, dict):
+            continue
+        cat = record.get('energyassetcategory')
+        if cat not in pending:
+            continue
+        stamps, values = pending[cat]
+        stamps.append(record['timestamp'])
+        values.append(record['value'])
+        if len(stamps) >= chunk_records:
+            flush(cat)
+
+    for cat in pending:
+        flush(cat)
+
+    cons = tuple(a.view() for a in series[CONSUMPTION_CATEGORY])
+    ret = tuple(a.view() for a in series[RETURN_CATEGORY])
+    return shaped_frame(cons, ret, fill_gaps=fill_gaps)
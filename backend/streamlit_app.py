@@ -2,30 +2,162 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+import hashlib
 import io
 from datetime import datetime
+from downsample import lttb
+from meter_ingest import to_intervals
 
-def shaping_df(df):
+# Aantal uploads waarvan de verwerkte data in geheugen blijft (oudste gaat er eerst uit)
+CACHE_ENTRIES = 4
+# Punten per tijdreeksgrafiek; genoeg voor een schermbrede plot
+PLOT_POINTS = 1200
+RAW_PAGE_SIZES = [100, 500, 1000, 5000]
+
+def shaping_df(df, fill_gaps=False):
     """Shape and process energy consumption data"""
-    df = df.set_index(['date'])
-    df.index = pd.to_datetime(df.index)
-    
+    dates = pd.DatetimeIndex(pd.to_datetime(df['date'])).as_unit('ns')
+    total = df['total'].to_numpy(dtype='float64')
+
+    # Zelfde ingest als de backend: telwerkstand of kwartierwaarden wordt herkend, resets en
+    # gaten gemeld; 'diff' is het verbruik per kwartier, gelabeld op het begin van het kwartier
+    ts, values, quality = to_intervals(dates.asi8, total, fill_gaps=fill_gaps)
+    index = pd.DatetimeIndex(ts.view('M8[ns]'), name='date')
+    if dates.tz is not None:
+        # to_intervals werkt in UTC-epoch; terug naar de tijdzone van de upload
+        index = index.tz_localize('UTC').tz_convert(dates.tz)
+    # De meting die het dichtst bij elk interval ligt (kwartierdata is op het raster gelegd)
+    raw = pd.Series(total, index=dates).sort_index()
+    raw = raw[~raw.index.duplicated(keep='last')]
+    df = pd.DataFrame({'total': raw.reindex(index, method='nearest', tolerance=pd.Timedelta('7min'))},
+                      index=index)
+
+    # Eén resample-pass; het dagmiddel wordt teruggezet op alle metingen van die dag
     daily = df['total'].resample('D').mean()
-    daily = daily.to_frame()
-    daily['diff'] = daily['total'].diff().fillna(0)
-    
-    df['daily_total'] = df['total'].resample('D').mean().reindex(df.index, method='ffill')
-    df['diff'] = df['total'].diff().fillna(0)
-    
+    df['daily_total'] = daily.reindex(df.index, method='ffill')
+    df['diff'] = values
+    df.attrs['quality'] = quality
+
     return df
 
 
+def file_hash(uploaded_file):
+    """Content-hash van de upload, één keer per upload berekend en in de sessie bewaard."""
+    hashes = st.session_state.setdefault('file_hashes', {})
+    if uploaded_file.file_id not in hashes:
+        hashes[uploaded_file.file_id] = hashlib.blake2b(uploaded_file.getvalue(), digest_size=16).hexdigest()
+    return hashes[uploaded_file.file_id]
+
+
+# cache_resource geeft hetzelfde object terug in plaats van een kopie per rerun; de
+# resultaten worden alleen gelezen, nooit gemuteerd
+@st.cache_resource(max_entries=CACHE_ENTRIES, show_spinner="Bestand verwerken...")
+def load_analysis(content_hash, file_name, _data, fill_gaps=False):
+    """Leest en verwerkt een upload één keer per inhoud en gap-instelling; alle aggregaten voor de tabs in één keer."""
+    if file_name.endswith('.csv'):
+        df = pd.read_csv(io.BytesIO(_data))
+    else:
+        df = pd.read_excel(io.BytesIO(_data))
+
+    if 'date' not in df.columns or 'total' not in df.columns:
+        raise ValueError("Bestand moet 'date' en 'total' kolommen bevatten")
+
+    df_processed = shaping_df(df, fill_gaps)
+    index = df_processed.index
+    hours = np.asarray(index.hour)
+    month_keys = np.asarray(index.year) * 100 + np.asarray(index.month)
+
+    daily_data = df_processed.groupby(index.normalize())['daily_total'].first()
+    monthly_data = df_processed['daily_total'].groupby(month_keys).sum()
+    return {
+        'df': df_processed,
+        'quality': df_processed.attrs['quality'],
+        'records': len(df_processed),
+        'start': index.min(),
+        'end': index.max(),
+        'avg_daily': df_processed['daily_total'].mean(),
+        'total': df_processed['daily_total'].sum(),
+        'hourly': df_processed.groupby(hours).mean(numeric_only=True),
+        'daily': daily_data,
+        'monthly': pd.Series(monthly_data.values,
+                             index=[f"{k // 100:04d}-{k % 100:02d}" for k in monthly_data.index]),
+    }
+
+
+def _hourly_figure(hour_of_day_avg):
+    fig, ax = plt.subplots(figsize=(12, 6))
+    ax.plot(
+        hour_of_day_avg.index,
+        hour_of_day_avg['diff'],
+        marker='o',
+        color='#96c63e',
+        linewidth=2,
+        markersize=8,
+        label='Gemiddeld Verbruik (kWh)'
+    )
+    ax.set_xlabel('Uur van de Dag', fontsize=12, fontweight='bold')
+    ax.set_ylabel('Gemiddeld Kwart-uur Verschil (kWh)', fontsize=12, fontweight='bold')
+    ax.set_title('Gemiddeld Energieverbruik per Uur', fontsize=14, fontweight='bold')
+    ax.legend(fontsize=11)
+    ax.grid(True, alpha=0.3, linestyle='--')
+    ax.set_xticks(range(0, 24))
+    return fig
+
+
+def _daily_figure(daily_data):
+    # LTTB houdt pieken en dalen zichtbaar bij een vast aantal punten, hoe lang de reeks ook is
+    idx = lttb(daily_data.index.values, daily_data.values, PLOT_POINTS)
+    x = daily_data.index[idx]
+    y = daily_data.values[idx]
+
+    fig, ax = plt.subplots(figsize=(14, 5))
+    ax.plot(x, y, marker='o' if len(x) <= 400 else None, linewidth=1.5, color='#373737', markersize=4)
+    ax.fill_between(x, y, alpha=0.3, color='#96c63e')
+    ax.set_xlabel('Datum', fontsize=11, fontweight='bold')
+    ax.set_ylabel('Dagelijks Verbruik (kWh)', fontsize=11, fontweight='bold')
+    ax.set_title('Dagelijks Energieverbruik Trend', fontsize=13, fontweight='bold')
+    ax.grid(True, alpha=0.3)
+    ax.tick_params(axis='x', rotation=45)
+    return fig
+
+
+def _monthly_figure(monthly_data):
+    fig, ax = plt.subplots(figsize=(12, 5))
+    ax.bar(range(len(monthly_data)), monthly_data.values, color='#96c63e', alpha=0.8, edgecolor='#373737')
+    ax.set_xlabel('Maand', fontsize=11, fontweight='bold')
+    ax.set_ylabel('Maandelijks Verbruik (kWh)', fontsize=11, fontweight='bold')
+    ax.set_title('Maandelijks Energieverbruik', fontsize=13, fontweight='bold')
+    ax.set_xticks(range(len(monthly_data)))
+    ax.set_xticklabels(monthly_data.index, rotation=45)
+    ax.grid(True, alpha=0.3, axis='y')
+    return fig
+
+
+CHARTS = {'hourly': _hourly_figure, 'daily': _daily_figure, 'monthly': _monthly_figure}
+
+
+@st.cache_data(max_entries=CACHE_ENTRIES * len(CHARTS), show_spinner=False)
+def render_chart(content_hash, kind, _data):
+    """PNG van een grafiek, één keer per upload gerenderd; reruns tonen alleen de bytes."""
+    fig = CHARTS[kind](_data)
+    fig.tight_layout()
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=100)
+    plt.close(fig)
+    return buf.getvalue()
+
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def processed_csv(content_hash, _df):
+    return _df.to_csv()
+
+
 def main():
     st.set_page_config(page_title="Energy Analysis", layout="wide")
-    
+
     st.title("⚡ Persoonlijke Energie Analyse")
     st.markdown("---")
-    
+
     # File upload section
     st.header("📤 Upload je slimme meter data")
     uploaded_file = st.file_uploader(
@@ -33,171 +165,149 @@ def main():
         type=['csv', 'xlsx', 'xls'],
         help="Bestand moet 'date' en 'total' kolommen bevatten"
     )
-    
+    fill_gaps = st.checkbox(
+        "Korte gaten opvullen",
+        value=False,
+        help="Ontbrekende kwartieren (tot 4 uur) lineair interpoleren; telwerkverschillen over een gat worden gelijk verdeeld"
+    )
+
     if uploaded_file is not None:
         try:
-            # Read file
-            if uploaded_file.name.endswith('.csv'):
-                df = pd.read_csv(uploaded_file)
-            else:
-                df = pd.read_excel(uploaded_file)
-            
-            # Validate columns
-            if 'date' not in df.columns or 'total' not in df.columns:
-                st.error("❌ Bestand moet 'date' en 'total' kolommen bevatten")
+            # Grafieken en export horen bij inhoud én gap-instelling
+            content_hash = f"{file_hash(uploaded_file)}-{int(fill_gaps)}"
+            try:
+                analysis = load_analysis(content_hash, uploaded_file.name, uploaded_file.getvalue(), fill_gaps)
+            except ValueError as e:
+                st.error(f"❌ {e}")
                 return
-            
-            # Process data
-            df_processed = shaping_df(df.copy())
-            
+            df_processed = analysis['df']
+
             # Create tabs
             tab1, tab2, tab3 = st.tabs(["📊 Persoonlijke Gegevens", "📈 Details", "📋 Data"])
-            
+
             # Tab 1: Personal Data
             with tab1:
                 st.header("Jouw Energieverbruik Profiel")
-                
+
                 # Key metrics
                 col1, col2, col3, col4 = st.columns(4)
-                
+
                 with col1:
                     st.metric(
                         "Totaal Records",
-                        len(df_processed),
+                        analysis['records'],
                         help="Aantal metingen in het bestand"
                     )
-                
+
                 with col2:
                     st.metric(
                         "Periode",
-                        f"{df_processed.index.min().strftime('%d-%m-%Y')} tot {df_processed.index.max().strftime('%d-%m-%Y')}",
+                        f"{analysis['start'].strftime('%d-%m-%Y')} tot {analysis['end'].strftime('%d-%m-%Y')}",
                         help="Datumrange van de data"
                     )
-                
+
                 with col3:
-                    avg_consumption = df_processed['daily_total'].mean()
                     st.metric(
                         "Gem. Dagelijks Verbruik",
-                        f"{avg_consumption:.2f} kWh",
+                        f"{analysis['avg_daily']:.2f} kWh",
                         help="Gemiddeld dagelijks energieverbruik"
                     )
-                
+
                 with col4:
-                    total_consumption = df_processed['daily_total'].sum()
                     st.metric(
                         "Totaal Verbruik",
-                        f"{total_consumption:.2f} kWh",
+                        f"{analysis['total']:.2f} kWh",
                         help="Totaal energieverbruik in periode"
                     )
-                
+
+                quality = analysis['quality']
+                with st.expander("🔎 Datakwaliteit", expanded=quality['gaps'] > 0 or quality['resets'] > 0):
+                    col1, col2, col3, col4 = st.columns(4)
+                    col1.metric("Type", "Telwerkstand" if quality['kind'] == 'register' else "Intervalwaarden",
+                                help=f"Meetstap {quality['step_minutes']:g} minuten")
+                    col2.metric("Gaten", quality['gaps'], help=f"Langste gat: {quality['largest_gap_hours']:.2f} uur")
+                    col3.metric("Ontbrekende intervallen", quality['missing_intervals'],
+                                help=f"Dekking {quality['coverage']:.1%} van de verwachte metingen")
+                    col4.metric("Resets", quality['resets'], help="Dalingen van het telwerk (meterwissel of overloop)")
+                    st.caption(
+                        f"{quality['filled_intervals'] + quality['spread_intervals']} kwartieren opgevuld, "
+                        f"{quality['duplicates']} dubbele en {quality['off_grid']} niet op het kwartier vallende metingen, "
+                        f"{quality['negative_values']} negatieve waarden op nul gezet"
+                    )
+
                 st.markdown("---")
-                
+
                 # Hourly analysis
                 st.subheader("⏰ Gemiddeld Verbruik per Uur")
-                
-                # Group by hour
-                hour_of_day_avg = df_processed.groupby(df_processed.index.hour).mean()
-                
-                # Create figure
-                fig, ax = plt.subplots(figsize=(12, 6))
-                ax.plot(
-                    hour_of_day_avg.index,
-                    hour_of_day_avg['diff'],
-                    marker='o',
-                    color='#96c63e',
-                    linewidth=2,
-                    markersize=8,
-                    label='Gemiddeld Verbruik (kWh)'
-                )
-                
-                ax.set_xlabel('Uur van de Dag', fontsize=12, fontweight='bold')
-                ax.set_ylabel('Gemiddeld Kwart-uur Verschil (kWh)', fontsize=12, fontweight='bold')
-                ax.set_title('Gemiddeld Energieverbruik per Uur', fontsize=14, fontweight='bold')
-                ax.legend(fontsize=11)
-                ax.grid(True, alpha=0.3, linestyle='--')
-                ax.set_xticks(range(0, 24))
-                
-                plt.tight_layout()
-                st.pyplot(fig)
-                
+                hour_of_day_avg = analysis['hourly']
+                st.image(render_chart(content_hash, 'hourly', hour_of_day_avg), use_column_width=True)
+
                 # Statistics
                 st.markdown("### 📊 Statistieken per Uur")
                 col1, col2, col3 = st.columns(3)
-                
+
                 with col1:
                     peak_hour = hour_of_day_avg['diff'].idxmax()
                     peak_value = hour_of_day_avg['diff'].max()
                     st.metric("🔴 Piekuur", f"{peak_hour}:00", f"{peak_value:.3f} kWh")
-                
+
                 with col2:
                     low_hour = hour_of_day_avg['diff'].idxmin()
                     low_value = hour_of_day_avg['diff'].min()
                     st.metric("🟢 Laagste Uur", f"{low_hour}:00", f"{low_value:.3f} kWh")
-                
+
                 with col3:
                     avg_hourly = hour_of_day_avg['diff'].mean()
                     st.metric("📈 Gemiddelde", "", f"{avg_hourly:.3f} kWh")
-            
+
             # Tab 2: Detailed Analysis
             with tab2:
                 st.header("📈 Gedetailleerde Analyse")
-                
+
                 # Daily consumption
                 st.subheader("Dagelijks Verbruik")
-                daily_data = df_processed.groupby(df_processed.index.date)['daily_total'].first()
-                
-                fig, ax = plt.subplots(figsize=(14, 5))
-                ax.plot(daily_data.index, daily_data.values, marker='o', linewidth=1.5, color='#373737', markersize=4)
-                ax.fill_between(daily_data.index, daily_data.values, alpha=0.3, color='#96c63e')
-                ax.set_xlabel('Datum', fontsize=11, fontweight='bold')
-                ax.set_ylabel('Dagelijks Verbruik (kWh)', fontsize=11, fontweight='bold')
-                ax.set_title('Dagelijks Energieverbruik Trend', fontsize=13, fontweight='bold')
-                ax.grid(True, alpha=0.3)
-                plt.xticks(rotation=45)
-                plt.tight_layout()
-                st.pyplot(fig)
-                
+                st.image(render_chart(content_hash, 'daily', analysis['daily']), use_column_width=True)
+
                 # Monthly analysis
                 st.subheader("Maandelijks Verbruik")
-                monthly_data = df_processed.groupby(df_processed.index.to_period('M'))['daily_total'].sum()
-                
-                fig, ax = plt.subplots(figsize=(12, 5))
-                bars = ax.bar(range(len(monthly_data)), monthly_data.values, color='#96c63e', alpha=0.8, edgecolor='#373737')
-                ax.set_xlabel('Maand', fontsize=11, fontweight='bold')
-                ax.set_ylabel('Maandelijks Verbruik (kWh)', fontsize=11, fontweight='bold')
-                ax.set_title('Maandelijks Energieverbruik', fontsize=13, fontweight='bold')
-                ax.set_xticks(range(len(monthly_data)))
-                ax.set_xticklabels([str(m) for m in monthly_data.index], rotation=45)
-                ax.grid(True, alpha=0.3, axis='y')
-                plt.tight_layout()
-                st.pyplot(fig)
-                
+                monthly_data = analysis['monthly']
+                st.image(render_chart(content_hash, 'monthly', monthly_data), use_column_width=True)
+
                 # Statistics table
                 st.markdown("### Maandstatistieken")
                 monthly_stats = pd.DataFrame({
-                    'Maand': [str(m) for m in monthly_data.index],
+                    'Maand': list(monthly_data.index),
                     'Totaal Verbruik (kWh)': monthly_data.values.round(2),
                     'Gemiddelde per Dag (kWh)': (monthly_data.values / [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31][:len(monthly_data)]).round(2)
                 })
                 st.dataframe(monthly_stats, use_container_width=True, hide_index=True)
-            
+
             # Tab 3: Raw Data
             with tab3:
                 st.header("📋 Ruwe Data")
-                st.dataframe(df_processed, use_container_width=True)
-                
+
+                # Alleen de gekozen pagina gaat naar de browser, niet het hele frame
+                col1, col2 = st.columns([1, 3])
+                with col1:
+                    page_size = st.selectbox("Rijen per pagina", RAW_PAGE_SIZES, index=1)
+                pages = max(1, -(-len(df_processed) // page_size))
+                with col2:
+                    page = st.number_input(f"Pagina (van {pages})", min_value=1, max_value=pages, value=1, step=1)
+                start = (int(page) - 1) * page_size
+                st.dataframe(df_processed.iloc[start:start + page_size], use_container_width=True)
+                st.caption(f"Rij {start + 1} t/m {min(start + page_size, len(df_processed))} van {len(df_processed)}")
+
                 # Download button
-                csv = df_processed.to_csv()
                 st.download_button(
                     label="📥 Download verwerkte data als CSV",
-                    data=csv,
+                    data=processed_csv(content_hash, df_processed),
                     file_name=f"energy_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
                     mime="text/csv"
                 )
-        
+
         except Exception as e:
             st.error(f"❌ Fout bij verwerken bestand: {str(e)}")
-    
+
     else:
         st.info("👆 Upload een CSV of Excel bestand om je energie analyse te zien")
 
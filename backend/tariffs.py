@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+
+def easter_sunday(years):
+    """Paaszondag per jaar (anonieme Gregoriaanse berekening), gevectoriseerd over `years`."""
+    y = np.asarray(years, dtype='int64')
+    a = y % 19
+    b = y // 100
+    c = y % 100
+    d = b // 4
+    e = b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i = c // 4
+    k = c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month = (h + l - 7 * m + 114) // 31
+    day = (h + l - 7 * m + 114) % 31 + 1
+    return pd.to_datetime({'year': y, 'month': month, 'day': day})
+
+
+def dutch_holidays(years):
+    """Landelijke feestdagen waarop netbeheerders het daltarief rekenen."""
+    years = np.unique(np.asarray(years, dtype='int64'))
+    if len(years) == 0:
+        return pd.DatetimeIndex([])
+
+    easter = pd.DatetimeIndex(easter_sunday(years))
+    kingsday = pd.DatetimeIndex(pd.to_datetime({'year': years, 'month': 4, 'day': 27}))
+    # Valt Koningsdag op zondag, dan wordt hij op zaterdag 26 april gevierd
+    kingsday = kingsday - pd.to_timedelta((kingsday.weekday == 6).astype(int), unit='D')
+
+    fixed = [pd.DatetimeIndex(pd.to_datetime({'year': years, 'month': mo, 'day': dd}))
+             for mo, dd in ((1, 1), (12, 25), (12, 26))]
+    moving = [easter + pd.Timedelta(days=offset) for offset in (1, 39, 50)]  # 2e Paasdag, Hemelvaart, 2e Pinksterdag
+    return fixed[0].append(fixed[1:] + moving + [kingsday]).sort_values()
+
+
+class TariffCalendar:
+    """Normaal/dal-venster van een netbeheerder, toegepast op een hele tijdindex tegelijk."""
+
+    def __init__(self, normaal_start=7, normaal_end=23, normaal_weekdays=(0, 1, 2, 3, 4), holidays_are_dal=True):
+        self.normaal_start = normaal_start
+        self.normaal_end = normaal_end
+        self.normaal_weekdays = tuple(normaal_weekdays)
+        self.holidays_are_dal = holidays_are_dal
+
+    @property
+    def key(self):
+        """Hashbare sleutel, bruikbaar als variant in de DatasetCache."""
+        return ('tariff', self.normaal_start, self.normaal_end, self.normaal_weekdays, self.holidays_are_dal)
+
+    def label_fields(self, year, month, day, hour, weekday):
+        """Boolean array: True voor normaaltarief, op lokale kalendervelden (bijv. uit een IntervalStore)."""
+        if len(hour) == 0:
+            return np.zeros(0, dtype=bool)
+
+        is_normaal = np.isin(weekday, self.normaal_weekdays)
+        is_normaal &= (hour >= self.normaal_start) & (hour < self.normaal_end)
+
+        if self.holidays_are_dal:
+            year = np.asarray(year, dtype='int64')
+            day_key = year * 10000 + np.asarray(month, dtype='int64') * 100 + np.asarray(day, dtype='int64')
+            holidays = dutch_holidays(np.unique(year))
+            holiday_keys = holidays.year * 10000 + holidays.month * 100 + holidays.day
+            is_normaal &= ~np.isin(day_key, np.asarray(holiday_keys))
+        return is_normaal
+
+
+# Ma-vr 07:00-23:00 is de landelijke standaard, ook voor het grootste deel van Enexis.
+# In delen van het Enexis-gebied (o.a. Brabant en Limburg) begint het daltarief al om
+# 21:00; die regio heeft een eigen sleutel.
+TARIFF_CALENDARS = {
+    'standaard': TariffCalendar(),
+    'liander': TariffCalendar(),
+    'stedin': TariffCalendar(),
+    'enexis': TariffCalendar(),
+    'enexis_zuid': TariffCalendar(normaal_end=21),
+}
+
+
+def get_tariff_calendar(grid_operator=None):
+    if grid_operator is None:
+        return TARIFF_CALENDARS['standaard']
+    try:
+        return TARIFF_CALENDARS[grid_operator.lower()]
+    except KeyError:
+        raise ValueError(f"Onbekende netbeheerder: {grid_operator}")
@@ -0,0 +1,24 @@
+import json
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# De backend-modules zijn platte modules naast deze map
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def write_export(tmp_path):
+    """Schrijft een `energyassetbundles`-export met verbruik (27) en teruglevering (26) per tijdstempel."""
+    def write(ts, cons, ret, name='export.json'):
+        records = []
+        for t, c, r in zip(ts, cons, ret):
+            stamp = pd.Timestamp(int(t), tz='UTC').isoformat()
+            records.append({'timestamp': stamp, 'energyassetcategory': 27, 'value': float(c)})
+            records.append({'timestamp': stamp, 'energyassetcategory': 26, 'value': float(r)})
+        path = tmp_path / name
+        path.write_text(json.dumps({'energyassetbundles': records}))
+        return str(path)
+    return write
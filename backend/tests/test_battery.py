@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from battery import simulate_batteries, sweep_batteries
+from calculator import EnergyCalculator
+
+CAPACITY = np.array([0.0, 2.5, 5.0, 10.0])
+POWER = CAPACITY * 0.5
+
+
+@pytest.fixture
+def profile():
+    rng = np.random.default_rng(0)
+    hours = np.arange(96 * 14) % 96 / 4
+    solar = np.clip(np.sin((hours - 6) / 12 * np.pi), 0, None) * 0.8
+    cons = rng.gamma(2, 0.08, len(hours))
+    return np.maximum(cons - solar, 0), np.maximum(solar - cons, 0), np.arange(len(hours)) // 96
+
+
+@pytest.mark.parametrize('strategy', ['self_consumption', 'arbitrage'])
+def test_energy_balance_and_soc_bounds(profile, strategy):
+    cons, ret, day = profile
+    price = np.sin(np.arange(len(cons)) / 96 * 2 * np.pi) * 0.1 + 0.15
+    sim = simulate_batteries(cons, ret, CAPACITY, POWER, efficiency=0.81, strategy=strategy, price=price, day=day)
+
+    # Wat extra uit het net komt, gaat de batterij in; de verliezen blijven in de batterij achter
+    np.testing.assert_allclose(sim['import'].sum(axis=0) - sim['export'].sum(axis=0),
+                               cons.sum() - ret.sum() + sim['charged'] - sim['discharged'], atol=1e-9)
+    np.testing.assert_allclose(sim['soc'][-1], 0.9 * sim['charged'] - sim['discharged'] / 0.9, atol=1e-9)
+    assert (sim['soc'] >= -1e-12).all()
+    assert (sim['soc'] <= CAPACITY + 1e-12).all()
+    assert (sim['import'] >= -1e-12).all() and (sim['export'] >= -1e-12).all()
+    np.testing.assert_allclose(sim['import'][:, 0], cons)
+
+
+def test_power_limit_follows_interval_length():
+    cons = np.array([0.0, 5.0, 5.0])
+    ret = np.array([5.0, 0.0, 0.0])
+    quarter = simulate_batteries(cons, ret, [10.0], [2.0], efficiency=1.0)
+    hourly = simulate_batteries(cons, ret, [10.0], [2.0], efficiency=1.0, interval_h=1.0)
+    np.testing.assert_allclose(quarter['soc'][:, 0], [0.5, 0.0, 0.0])
+    np.testing.assert_allclose(hourly['soc'][:, 0], [2.0, 0.0, 0.0])
+    np.testing.assert_allclose(hourly['import'][:, 0], [0.0, 3.0, 5.0])
+
+
+def test_sweep_blocks_match_one_simulation(profile, monkeypatch):
+    cons, ret, _ = profile
+    whole = sweep_batteries(cons, ret, CAPACITY, POWER, 0.13)
+    monkeypatch.setattr('battery.BLOCK_CELLS', len(cons))
+    for key in ('import', 'export', 'charged', 'fixed'):
+        np.testing.assert_allclose(sweep_batteries(cons, ret, CAPACITY, POWER, 0.13)[key], whole[key])
+
+
+def test_hourly_export_is_scaled_per_hour(write_export):
+    ts = pd.date_range('2023-01-01', '2024-01-01', freq='h', tz='UTC', inclusive='left').as_unit('ns').asi8
+    calc = EnergyCalculator(write_export(ts, np.full(len(ts), 0.4), np.zeros(len(ts))), use_ingest_cache=False)
+    calc.prices_path = calc.dynamic_path = '/nonexistent'
+    result, = calc.simulate_battery([5.0])
+    assert result['yearlyImportKwh'] == pytest.approx(0.4 * 365.25 * 24, abs=1)
+    assert result['yearlyCycles'] == 0
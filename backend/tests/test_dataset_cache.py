@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+
+from dataset_cache import DatasetCache
+
+
+def touch(path, seconds):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + seconds * 10**9))
+
+
+def files(tmp_path, *names):
+    paths = []
+    for name in names:
+        path = tmp_path / name
+        path.write_text(name)
+        paths.append(str(path))
+    return paths
+
+
+def test_hits_and_misses_are_counted(tmp_path):
+    a, = files(tmp_path, 'a.json')
+    cache, loads = DatasetCache(), []
+    loader = lambda: loads.append(1) or np.zeros(10)  # noqa: E731
+    first = cache.get(a, loader)
+    assert cache.get(a, loader) is first
+    cache.get(a, loader, variant='ander')
+    assert len(loads) == 2
+    assert cache.stats() == {'hits': 1, 'misses': 2, 'entries': 2, 'bytes': 160, 'max_bytes': cache.max_bytes}
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    a, b, c, d = files(tmp_path, 'a.json', 'b.json', 'c.json', 'd.json')
+    cache, loads = DatasetCache(max_bytes=2000), []
+
+    def get(path, size=100):
+        return cache.get(path, lambda: loads.append(os.path.basename(path)) or np.zeros(size))
+
+    get(a), get(b)
+    get(a)  # a is nu het recentst gebruikt
+    get(c)
+    assert cache.stats()['entries'] == 2
+    assert cache.stats()['bytes'] == 1600
+    get(a), get(b)
+    assert loads == ['a.json', 'b.json', 'c.json', 'b.json']
+
+    # Een entry die alleen al te groot is blijft staan, de rest gaat eruit
+    get(d, size=1000)
+    assert cache.stats()['entries'] == 1
+    assert cache.stats()['bytes'] == 8000
+
+
+def test_older_versions_of_a_file_are_dropped(tmp_path):
+    a, log = files(tmp_path, 'a.json', 'a.json.appended.bin')
+    cache = DatasetCache()
+    cache.get(a, lambda: np.zeros(10), companions=(log,))
+    cache.get(a, lambda: np.zeros(10), variant='ander', companions=(log,))
+
+    touch(log, 1)
+    fresh = cache.get(a, lambda: np.ones(10), companions=(log,))
+    assert fresh[0] == 1
+    assert cache.stats()['entries'] == 1
+    assert cache.stats()['bytes'] == 80
+
+    touch(a, 1)
+    cache.put(a, np.full(10, 2.0), companions=(log,))
+    assert cache.get(a, lambda: None, companions=(log,))[0] == 2
+    assert cache.stats()['entries'] == 1
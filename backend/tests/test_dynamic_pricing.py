@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from calculator import EnergyCalculator
+from dynamic_pricing import BTW, DynamicContracts, PriceStore, price_dynamic_contracts
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+PRICES = os.path.join(DATA_DIR, 'prices.csv')
+CONTRACTS = os.path.join(DATA_DIR, 'dynamic_contracts.csv')
+
+
+def local_quarters(start, end):
+    index = pd.date_range(pd.Timestamp(start, tz='Europe/Amsterdam'), pd.Timestamp(end, tz='Europe/Amsterdam'),
+                          freq='15min', inclusive='left')
+    return index.tz_convert('UTC').as_unit('ns').asi8
+
+
+def test_prices_align_on_utc_across_dst():
+    store = PriceStore.from_csv(PRICES)
+    # De fixture heeft per UTC-uur 100 + uur EUR/MWh, van 2024-03-30 22:00 tot 2024-04-01 22:00 UTC
+    ts = local_quarters('2024-03-31 00:00', '2024-03-31 06:00')
+    utc_hour = pd.to_datetime(ts, utc=True).hour.to_numpy()
+    np.testing.assert_allclose(store.align_ns(ts), (100 + utc_hour) / 1000)
+    # 03:00 zomertijd is 01:00 UTC; het uur 02:00 lokaal bestaat niet
+    assert store.align_ns(local_quarters('2024-03-31 03:00', '2024-03-31 03:15'))[0] == pytest.approx(0.101)
+    outside = local_quarters('2024-03-30 22:45', '2024-03-30 23:00')
+    outside = np.r_[outside, local_quarters('2024-04-02 00:00', '2024-04-02 00:15')]
+    assert np.isnan(store.align_ns(outside)).all()
+
+
+def test_contracts_read_comma_decimals():
+    contracts = DynamicContracts.from_csv(CONTRACTS)
+    assert list(contracts.providers) == ['Goedkoop', 'Duur']
+    np.testing.assert_allclose(contracts.opslag, [0.02, 0.03])
+    np.testing.assert_allclose(contracts.extra_kosten, [6.25, 0.0])
+
+
+def test_cost_formula():
+    hour = 3600 * 10**9
+    store = PriceStore(np.array([0, hour]), np.array([0.10, 0.30]))
+    contracts = DynamicContracts(np.array(['a', 'b'], dtype=object), np.array([0.02, 0.03]), np.array([6.25, 0.0]))
+    ts = np.array([0, hour // 2, hour, 2 * hour])
+    cons = np.array([1.0, 0.0, 2.0, 5.0])
+    ret = np.array([0.0, 1.0, 0.0, 5.0])
+    result = price_dynamic_contracts(ts, cons, ret, store, contracts, eb_per_kwh=0.13, netbeheer_jaar=500.0)
+
+    # Het laatste interval valt na de prijsreeks en telt niet mee
+    levering = (1.0 * 0.10 + 2.0 * 0.30 + contracts.opslag * 3.0) * BTW
+    vergoeding = 1.0 * 0.10 * BTW
+    expected = levering - vergoeding + (3.0 - 1.0) * 0.13 + contracts.extra_kosten * 12 + 500.0
+    np.testing.assert_allclose(result['yearly'], expected)
+    assert (result['priced_intervals'], result['total_intervals']) == (3, 4)
+    assert result['avg_price'] == pytest.approx(0.7 / 3)
+
+
+def test_calculate_dynamic_prices_the_fixture_contracts(write_export):
+    ts = local_quarters('2024-03-31 00:00', '2024-04-01 00:00')
+    calc = EnergyCalculator(write_export(ts, np.full(len(ts), 0.25), np.zeros(len(ts))), use_ingest_cache=False)
+    calc.prices_path, calc.dynamic_path = PRICES, CONTRACTS
+    results = calc.calculate_dynamic()
+    assert [r['provider'] for r in results] == ['Goedkoop', 'Duur']
+    assert results[0]['priceCoverage'] == 1.0
+    assert results[0]['avgEpexPrice'] == pytest.approx(np.mean(100 + pd.to_datetime(ts, utc=True).hour) / 1000,
+                                                       abs=1e-4)
+    # De contracten verschillen alleen in opslag en vaste kosten per maand
+    gap = results[1]['yearlyCost'] - results[0]['yearlyCost']
+    assert gap == pytest.approx(0.01 * results[0]['estUsage'] * BTW - 6.25 * 12, abs=1.0)
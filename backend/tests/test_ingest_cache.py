@@ -0,0 +1,119 @@
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import ingest_cache
+from calculator import EnergyCalculator
+from ingest_cache import (SIDECAR_DTYPE, append_log_path, append_to_log, frame_from_arrays, quality_path,
+                          read_append_log, sidecar_path)
+
+START = pd.Timestamp('2024-01-01', tz='UTC').value
+QUARTER = 15 * 60 * 10**9
+
+
+def frame(start, n, value=1.0):
+    ts = START + (start + np.arange(n)) * QUARTER
+    return frame_from_arrays(ts, np.full(n, value), np.zeros(n))
+
+
+def test_torn_record_is_cut_before_the_next_append(tmp_path):
+    export = tmp_path / 'export.json'
+    export.write_text('{}')
+    append_to_log(str(export), frame(0, 4))
+    with open(append_log_path(str(export)), 'ab') as f:
+        f.write(b'\x01\x02\x03')
+    assert len(read_append_log(str(export))) == 4
+
+    append_to_log(str(export), frame(4, 4, value=2.0))
+    assert os.path.getsize(append_log_path(str(export))) == 8 * SIDECAR_DTYPE.itemsize
+    df = read_append_log(str(export))
+    assert len(df) == 8
+    assert df.index[0] == pd.Timestamp(START, tz='UTC')
+    np.testing.assert_array_equal(df['consumption_interval'], [1.0] * 4 + [2.0] * 4)
+
+
+def test_log_of_a_replaced_export_is_ignored(tmp_path):
+    export = tmp_path / 'export.json'
+    export.write_text('{}')
+    append_to_log(str(export), frame(0, 4), quality={'consumption': {'kind': 'interval'}})
+    assert read_append_log(str(export)).attrs['quality'] == {'consumption': {'kind': 'interval'}}
+
+    export.write_text('{"energyassetbundles": []}')
+    assert read_append_log(str(export)) is None
+
+    append_to_log(str(export), frame(10, 2))
+    df = read_append_log(str(export))
+    assert len(df) == 2
+    assert 'quality' not in df.attrs
+
+
+@pytest.fixture
+def parses(monkeypatch):
+    """Telt hoe vaak de JSON echt geparseerd wordt in plaats van uit de sidecar gelezen."""
+    calls = []
+    parse = EnergyCalculator._parse_json
+
+    def counting(self):
+        calls.append(self.input_path)
+        return parse(self)
+    monkeypatch.setattr(EnergyCalculator, '_parse_json', counting)
+    return calls
+
+
+def sidecars(export):
+    return sorted(glob.glob(f"{glob.escape(export)}.*.shaped.npy*"))
+
+
+def test_changed_export_replaces_the_sidecar(write_export, parses):
+    ts = START + np.arange(96) * QUARTER
+    export = write_export(ts, np.full(96, 0.1), np.zeros(96))
+    EnergyCalculator(export)
+    old = sidecar_path(export)
+    assert sidecars(export) == [old, quality_path(old)]
+
+    EnergyCalculator(export)
+    assert len(parses) == 1
+
+    # Alleen aanraken geeft al een nieuwe sleutel; herschrijven ook nieuwe inhoud
+    st = os.stat(export)
+    os.utime(export, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    EnergyCalculator(export)
+    assert len(parses) == 2
+    touched = sidecar_path(export)
+    assert sidecars(export) == [touched, quality_path(touched)]
+
+    write_export(ts, np.full(96, 0.4), np.zeros(96))
+    st = os.stat(export)
+    os.utime(export, ns=(st.st_atime_ns, st.st_mtime_ns + 2 * 10**9))
+    calc = EnergyCalculator(export)
+    assert len(parses) == 3
+    np.testing.assert_allclose(calc.store.cons, 0.4)
+    new = sidecar_path(export)
+    assert new not in (old, touched)
+    assert sidecars(export) == [new, quality_path(new)]
+    assert not os.path.exists(old) and not os.path.exists(quality_path(touched))
+
+    np.testing.assert_allclose(EnergyCalculator(export).store.cons, 0.4)
+    assert len(parses) == 3
+
+
+def test_sidecar_of_another_version_falls_back_to_json(write_export, parses, monkeypatch):
+    ts = START + np.arange(96) * QUARTER
+    export = write_export(ts, np.full(96, 0.1), np.zeros(96))
+    EnergyCalculator(export)
+    old = sidecar_path(export)
+
+    monkeypatch.setattr(ingest_cache, 'SIDECAR_VERSION', ingest_cache.SIDECAR_VERSION + 1)
+    np.testing.assert_allclose(EnergyCalculator(export).store.cons, 0.1)
+    assert len(parses) == 2
+    assert sidecars(export) == [sidecar_path(export), quality_path(sidecar_path(export))]
+    assert not os.path.exists(old)
+
+    # Zelfde naam maar ander recordformaat: ook dan de JSON
+    np.save(sidecar_path(export), np.zeros(96))
+    assert ingest_cache.load_sidecar(export) is None
+    np.testing.assert_allclose(EnergyCalculator(export).store.cons, 0.1)
+    assert len(parses) == 3
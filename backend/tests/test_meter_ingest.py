@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from calculator import EnergyCalculator
+from meter_ingest import INTERVAL_NS, REGISTER_MIN_READINGS, detect_kind, to_intervals
+
+START = pd.Timestamp('2024-01-08', tz='UTC').value
+HOUR_NS = 4 * INTERVAL_NS
+
+
+def quarters(n, start=START):
+    return start + np.arange(n) * INTERVAL_NS
+
+
+def register(n, step=0.25, level=5000.0):
+    return level + np.arange(n) * step
+
+
+def test_detect_register_and_interval():
+    rng = np.random.default_rng(0)
+    usage = rng.gamma(2, 0.05, 500)
+    assert detect_kind(5000 + np.cumsum(usage)) == 'register'
+    assert detect_kind(usage) == 'interval'
+    assert detect_kind(np.zeros(500)) == 'interval'
+
+
+@pytest.mark.parametrize('values', [[0.30, 0.32, 0.35, 0.37], [2.0, 2.05, 2.1, 2.12], [1.0, 1.05]])
+def test_short_rising_series_is_interval(values):
+    assert detect_kind(values) == 'interval'
+    _, out, quality = to_intervals(quarters(len(values)), values)
+    assert quality['kind'] == 'interval'
+    np.testing.assert_allclose(out, values)
+
+
+def test_register_needs_a_day_of_readings():
+    assert detect_kind(register(REGISTER_MIN_READINGS - 1)) == 'interval'
+    assert detect_kind(register(REGISTER_MIN_READINGS)) == 'register'
+
+
+def test_register_differences_are_labelled_at_interval_start():
+    ts, out, quality = to_intervals(quarters(200), register(200))
+    assert quality['kind'] == 'register'
+    np.testing.assert_array_equal(ts, quarters(199))
+    np.testing.assert_allclose(out, 0.25)
+
+
+def test_register_reset_leaves_interval_unknown():
+    values = register(200)
+    values[120:] = values[120:] - values[120] + 1.0
+    ts, out, quality = to_intervals(quarters(200), values)
+    assert quality['resets'] == 1
+    assert len(out) == 198
+    assert quarters(200)[119] not in ts
+    assert out.max() == pytest.approx(0.25)
+
+
+def test_register_gap_is_spread_only_with_fill():
+    keep = np.ones(200, dtype=bool)
+    keep[100:104] = False
+    ts, values = quarters(200)[keep], register(200)[keep]
+
+    _, out, quality = to_intervals(ts, values)
+    assert quality['missing_intervals'] == 4
+    assert out.max() == pytest.approx(1.25)
+
+    filled_ts, filled, quality = to_intervals(ts, values, fill_gaps=True)
+    np.testing.assert_array_equal(filled_ts, quarters(199))
+    np.testing.assert_allclose(filled, 0.25)
+    assert quality['spread_intervals'] == 5
+    assert filled.sum() == pytest.approx(out.sum())
+
+
+def test_interval_gaps_are_interpolated_up_to_max_fill():
+    values = np.full(200, 0.5)
+    keep = np.ones(200, dtype=bool)
+    keep[50:54] = False
+    keep[100:130] = False
+    keep[:3] = False
+    ts, out, quality = to_intervals(quarters(200)[keep], values[keep], fill_gaps=True, max_fill=16)
+    assert quality['filled_intervals'] == 4
+    assert quality['missing_intervals'] == 30
+    assert ts[0] == quarters(200)[3]
+    np.testing.assert_allclose(out, 0.5)
+
+
+def test_duplicates_and_off_grid_readings_snap_to_quarter():
+    ts = quarters(4)
+    ts = np.array([ts[0], ts[1] + 60 * 10**9, ts[1] + 120 * 10**9, ts[2], ts[3]])
+    out_ts, out, quality = to_intervals(ts, [1.0, 2.0, 3.0, 4.0, -1.0])
+    np.testing.assert_array_equal(out_ts, quarters(4))
+    np.testing.assert_allclose(out, [1.0, 3.0, 4.0, 0.0])
+    assert quality['duplicates'] == 1
+    assert quality['off_grid'] == 2
+    assert quality['negative_values'] == 1
+
+
+def test_hourly_series_is_left_on_its_own_step():
+    ts = START + np.arange(24 * 60) * HOUR_NS
+    values = np.random.default_rng(1).uniform(0.2, 1.0, len(ts))
+    keep = np.ones(len(ts), dtype=bool)
+    keep[500:503] = False
+    for fill in (False, True):
+        out_ts, out, quality = to_intervals(ts[keep], values[keep], fill_gaps=fill)
+        np.testing.assert_array_equal(out_ts, ts[keep])
+        assert out.sum() == pytest.approx(values[keep].sum())
+        assert quality['step_minutes'] == 60
+        assert quality['missing_intervals'] == 3
+        assert quality['filled_intervals'] == quality['spread_intervals'] == 0
+
+
+def test_hourly_register_is_not_spread():
+    ts = START + np.arange(24 * 30) * HOUR_NS
+    out_ts, out, quality = to_intervals(ts, register(len(ts), step=1.0), fill_gaps=True)
+    assert quality['kind'] == 'register'
+    np.testing.assert_array_equal(out_ts, ts[:-1])
+    np.testing.assert_allclose(out, 1.0)
+
+
+def test_daily_series_across_dst_has_no_gaps():
+    dates = pd.date_range('2024-03-20', '2024-04-10', freq='D', tz='Europe/Amsterdam')
+    _, out, quality = to_intervals(dates.as_unit('ns').asi8, np.full(len(dates), 10.0))
+    assert len(out) == len(dates)
+    assert quality['gaps'] == 0
+
+
+def test_hourly_export_totals_match_input(write_export):
+    ts = START + np.arange(24 * 60) * HOUR_NS
+    rng = np.random.default_rng(2)
+    cons, ret = rng.uniform(0.2, 1.0, len(ts)).round(3), rng.uniform(0, 0.3, len(ts)).round(3)
+    calc = EnergyCalculator(write_export(ts, cons, ret), use_ingest_cache=False)
+    summary = calc.get_summary()
+    assert summary['total_kwh'] == pytest.approx(cons.sum(), abs=0.01)
+    assert summary['total_return_kwh'] == pytest.approx(ret.sum(), abs=0.01)
+    assert summary['data_quality']['step_minutes'] == 60
+
+
+def test_upload_chunk_keeps_stored_kind(write_export):
+    ts = quarters(400)
+    rng = np.random.default_rng(3)
+    cons, ret = rng.uniform(0.1, 0.5, len(ts)), rng.uniform(0, 0.2, len(ts))
+    calc = EnergyCalculator(write_export(ts[:396], cons[:396], ret[:396]), use_ingest_cache=False)
+    assert calc.store.quality['consumption']['kind'] == 'interval'
+
+    chunk = [0.30, 0.32, 0.35, 0.37]
+    records = [{'timestamp': pd.Timestamp(int(t), tz='UTC').isoformat(), 'energyassetcategory': 27, 'value': v}
+               for t, v in zip(ts[396:], chunk)]
+    assert calc.append_readings(records) == {'added': 4, 'replaced': 0}
+    np.testing.assert_allclose(calc.store.cons[-4:], chunk, rtol=1e-6)
+    assert calc.get_summary()['total_kwh'] == pytest.approx(cons[:396].sum() + sum(chunk), abs=0.01)
+
+
+def test_streamlit_shaping_keeps_upload_timezone():
+    pytest.importorskip('streamlit')
+    from streamlit_app import shaping_df
+
+    dates = pd.date_range('2024-01-10', periods=4 * 96, freq='15min', tz='Europe/Amsterdam')
+    df = pd.DataFrame({'date': dates.strftime('%Y-%m-%dT%H:%M:%S%z'), 'total': register(len(dates), step=0.1)})
+    out = shaping_df(df)
+    assert str(out.index[0]) == '2024-01-10 00:00:00+01:00'
+    assert out['total'].notna().all()
+    assert out['daily_total'].notna().all()
+    assert out['daily_total'].iloc[0] == pytest.approx(df['total'][:96].mean())
@@ -0,0 +1,73 @@
+import gzip
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import app as backend_app
+from dataset_cache import DatasetCache
+from responses import COMPRESS_MIN_BYTES
+
+START = pd.Timestamp('2024-03-01', tz='UTC').value
+QUARTER = 15 * 60 * 10**9
+LARGE = '/api/usage?resolution=15min'
+SMALL = '/api/usage?resolution=month'
+
+
+@pytest.fixture
+def client(monkeypatch, write_export):
+    ts = START + np.arange(96 * 14) * QUARTER
+    monkeypatch.setattr(backend_app, 'DATA_FILE', write_export(ts, np.full(len(ts), 0.25), np.zeros(len(ts))))
+    monkeypatch.setattr(backend_app, 'DATASET_CACHE', DatasetCache())
+    return backend_app.app.test_client()
+
+
+def test_matching_etag_gets_304(client):
+    first = client.get(LARGE)
+    assert first.status_code == 200 and first.headers['ETag']
+    again = client.get(LARGE, headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert again.data == b''
+    assert again.headers['ETag'] == first.headers['ETag']
+    assert client.get(LARGE + '&start=2024-03-02').headers['ETag'] != first.headers['ETag']
+
+
+def test_gzip_variant_has_its_own_etag_and_still_matches(client):
+    plain = client.get(LARGE)
+    zipped = client.get(LARGE, headers={'Accept-Encoding': 'gzip'})
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in zipped.headers['Vary']
+    assert zipped.headers['ETag'] == plain.headers['ETag'].rstrip('"') + '-gz"'
+    assert json.loads(gzip.decompress(zipped.data)) == plain.json
+    for etag in (plain.headers['ETag'], zipped.headers['ETag']):
+        assert client.get(LARGE, headers={'If-None-Match': etag, 'Accept-Encoding': 'gzip'}).status_code == 304
+
+
+def test_brotli_is_preferred_when_installed(client):
+    pytest.importorskip('brotli')
+    response = client.get(LARGE, headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert response.headers['ETag'].endswith('-br"')
+
+
+def test_small_responses_stay_uncompressed(client):
+    response = client.get(SMALL, headers={'Accept-Encoding': 'gzip'})
+    assert len(response.data) < COMPRESS_MIN_BYTES
+    assert 'Content-Encoding' not in response.headers
+    assert not response.headers['ETag'].endswith('-gz"')
+    assert response.json['data']
+
+
+def test_upload_changes_the_etag(client):
+    before = client.get(LARGE).headers['ETag']
+    stamp = pd.Timestamp(START + 96 * 14 * QUARTER, tz='UTC').isoformat()
+    upload = client.post('/api/upload-readings', json={'energyassetbundles': [
+        {'timestamp': stamp, 'energyassetcategory': 27, 'value': 0.5},
+        {'timestamp': stamp, 'energyassetcategory': 26, 'value': 0.0},
+    ]})
+    assert upload.json['added'] == 1
+    after = client.get(LARGE, headers={'If-None-Match': before})
+    assert after.status_code == 200
+    assert after.headers['ETag'] != before
+    assert after.json['data'][-1]['verbruik'] == 0.5
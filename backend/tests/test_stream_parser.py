@@ -0,0 +1,43 @@
+import json
+
+import pandas as pd
+import pytest
+
+from calculator import shape_records
+from stream_parser import iter_bundle_records, parse_streaming
+
+RECORDS = [
+    {'timestamp': '2024-01-01T00:00:00+00:00', 'energyassetcategory': 27, 'value': 0.25},
+    {'timestamp': '2024-01-01T00:15:00+00:00', 'energyassetcategory': 27, 'value': 0.5},
+    {'timestamp': '2024-01-01T00:00:00+00:00', 'energyassetcategory': 26, 'value': 0.125},
+]
+
+
+def write(tmp_path, text):
+    path = tmp_path / 'export.json'
+    path.write_text(text)
+    return str(path)
+
+
+@pytest.mark.parametrize('read_size', [7, 1 << 20])
+def test_only_the_top_level_bundles_key_counts(tmp_path, read_size):
+    text = json.dumps({'x': {'energyassetbundles': [1]}, 'meta': [{'energyassetbundles': []}], 'count': 12345,
+                       'energyassetbundles': RECORDS, 'trailer': {'energyassetbundles': [2]}})
+    assert list(iter_bundle_records(write(tmp_path, text), read_size=read_size)) == RECORDS
+
+
+def test_missing_bundles_key_yields_nothing(tmp_path):
+    text = json.dumps({'x': {'energyassetbundles': RECORDS}})
+    assert list(iter_bundle_records(write(tmp_path, text))) == []
+
+
+def test_non_object_records_are_skipped(tmp_path):
+    path = write(tmp_path, json.dumps({'energyassetbundles': [1, None, *RECORDS, 'x']}))
+    df = parse_streaming(path)
+    pd.testing.assert_frame_equal(df, shape_records(RECORDS, fill_gaps=False), check_freq=False)
+
+
+def test_truncated_bundles_raise(tmp_path):
+    text = json.dumps({'energyassetbundles': RECORDS})[:-2]
+    with pytest.raises(ValueError):
+        list(iter_bundle_records(write(tmp_path, text), read_size=16))
@@ -0,0 +1,6 @@
+from tariffs import get_tariff_calendar
+
+
+def test_enexis_keeps_the_national_window():
+    assert get_tariff_calendar('enexis').key == get_tariff_calendar().key
+    assert get_tariff_calendar('Enexis_Zuid').normaal_end == 21
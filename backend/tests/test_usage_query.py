@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from interval_store import IntervalStore
+from usage_query import MAX_POINTS, query_usage
+
+
+def store(start, end):
+    """Eén kWh per kwartier tussen twee lokale tijden."""
+    index = pd.date_range(pd.Timestamp(start, tz='Europe/Amsterdam'), pd.Timestamp(end, tz='Europe/Amsterdam'),
+                          freq='15min', inclusive='left')
+    ts = index.tz_convert('UTC').as_unit('ns').asi8
+    return IntervalStore.from_arrays(ts, np.ones(len(ts)), np.zeros(len(ts)))
+
+
+@pytest.fixture(scope='module')
+def spring():
+    return store('2024-03-25', '2024-04-08')
+
+
+@pytest.fixture(scope='module')
+def autumn():
+    return store('2024-10-21', '2024-11-04')
+
+
+def test_dst_days_have_their_own_length(spring, autumn):
+    days, _ = query_usage(spring, '2024-03-30', '2024-04-02', 'day')
+    assert [(d['timestamp'], d['verbruik']) for d in days] == [
+        ('2024-03-30T00:00:00+01:00', 96.0), ('2024-03-31T00:00:00+01:00', 92.0), ('2024-04-01T00:00:00+02:00', 96.0)]
+    days, _ = query_usage(autumn, '2024-10-27', '2024-10-28', 'day')
+    assert [(d['timestamp'], d['verbruik']) for d in days] == [('2024-10-27T00:00:00+02:00', 100.0)]
+
+
+def test_dst_hours(spring, autumn):
+    hours, _ = query_usage(spring, '2024-03-31T01:00', '2024-03-31T04:00', 'hour')
+    assert [h['timestamp'] for h in hours] == ['2024-03-31T01:00:00+01:00', '2024-03-31T03:00:00+02:00']
+    hours, _ = query_usage(autumn, '2024-10-27T01:00', '2024-10-27T04:00', 'hour')
+    assert [h['timestamp'] for h in hours] == ['2024-10-27T01:00:00+02:00', '2024-10-27T02:00:00+02:00',
+                                               '2024-10-27T02:00:00+01:00', '2024-10-27T03:00:00+01:00']
+    assert {h['verbruik'] for h in hours} == {4.0}
+
+
+def test_week_and_month_labels(spring):
+    weeks, _ = query_usage(spring, resolution='week')
+    assert [w['timestamp'] for w in weeks] == ['2024-03-25T00:00:00+01:00', '2024-04-01T00:00:00+02:00']
+    assert [w['verbruik'] for w in weeks] == [7 * 96 - 4, 7 * 96]
+    months, _ = query_usage(spring, resolution='month')
+    assert [m['timestamp'] for m in months] == ['2024-03-01T00:00:00+01:00', '2024-04-01T00:00:00+02:00']
+
+
+def test_window_is_start_inclusive_end_exclusive(spring):
+    points, _ = query_usage(spring, '2024-04-01T10:00', '2024-04-01T11:00', '15min')
+    assert [p['timestamp'] for p in points] == [f'2024-04-01T10:{m:02d}:00+02:00' for m in (0, 15, 30, 45)]
+    # Met expliciete offset: 08:00 UTC is 10:00 lokaal
+    points, _ = query_usage(spring, '2024-04-01T08:00:00+00:00', '2024-04-01T08:15:00+00:00', '15min')
+    assert [p['timestamp'] for p in points] == ['2024-04-01T10:00:00+02:00']
+    assert query_usage(spring, '2024-05-01', '2024-06-01', 'day') == ([], 'day')
+
+
+def test_resolution_is_chosen_when_not_given(spring):
+    long = store('2022-01-01', '2025-01-01')
+    data, resolution = query_usage(long)
+    assert resolution == 'day'
+    assert len(data) == 3 * 365 + 1
+    assert query_usage(spring)[1] == 'hour'
+    with pytest.raises(ValueError, match=str(MAX_POINTS)):
+        query_usage(long, resolution='hour')
+    with pytest.raises(ValueError):
+        query_usage(spring, resolution='minute')
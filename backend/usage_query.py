@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+from interval_store import NS_PER_HOUR, TIMEZONE
+
+# Resoluties; bucketgrenzen liggen in lokale (NL) tijd
+RESOLUTIONS = ('15min', 'hour', 'day', 'week', 'month')
+
+# Bovengrens op het aantal punten per response; kies anders een grovere resolutie
+MAX_POINTS = 20000
+# Zonder opgegeven resolutie: de fijnste hiervan die binnen MAX_POINTS blijft
+AUTO_RESOLUTIONS = ('hour', 'day', 'week')
+
+
+def parse_timestamp(value, tz=TIMEZONE):
+    """ISO-datum/tijd naar tz-aware Timestamp; zonder tijdzone geldt lokale NL-tijd."""
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        return ts.tz_localize(tz, ambiguous=True, nonexistent='shift_forward')
+    return ts.tz_convert(tz)
+
+
+def _bucket_keys(window, resolution, dates):
+    """Oplopende integer-sleutel per interval; de store is op tijd gesorteerd, dus buckets zijn aaneengesloten."""
+    if resolution == 'hour':
+        # NL-offsets zijn hele uren, dus een UTC-uur is ook een lokaal uur
+        return window.ts // NS_PER_HOUR
+    if resolution == 'day':
+        return dates.astype('int64')
+    if resolution == 'week':
+        return dates.astype('int64') - window.weekday
+    return window.month_key()
+
+
+def _bucket_labels(window, resolution, starts, dates):
+    """ISO-tijdstempel (lokale tijd) van het begin van elke bucket; alleen over de output-rijen."""
+    if resolution in ('15min', 'hour'):
+        ts = window.ts if starts is None else window.ts[starts] // NS_PER_HOUR * NS_PER_HOUR
+        index = pd.DatetimeIndex(pd.to_datetime(ts, utc=True)).tz_convert(TIMEZONE)
+    else:
+        first = dates[starts]
+        if resolution == 'week':
+            first = first - window.weekday[starts].astype('int64')
+        elif resolution == 'month':
+            first = first.astype('M8[M]').astype('M8[D]')
+        index = pd.DatetimeIndex(first).tz_localize(TIMEZONE)
+    return [ts.isoformat() for ts in index]
+
+
+def auto_resolution(window):
+    """Fijnste resolutie uit AUTO_RESOLUTIONS waarvoor het venster binnen MAX_POINTS blijft.
+
+    Geschat uit de tijdspanne, zonder de buckets te tellen; een lokale dag of week
+    kan het venster aan beide kanten maar deels raken, vandaar de extra bucket.
+    """
+    hours = int(window.ts[-1] - window.ts[0]) // NS_PER_HOUR + 1
+    for resolution, per_bucket in zip(AUTO_RESOLUTIONS, (1, 24, 24 * 7)):
+        if hours // per_bucket + 2 <= MAX_POINTS:
+            return resolution
+    return 'month'
+
+
+def query_usage(store, start=None, end=None, resolution=None):
+    """Verbruik en teruglevering in [start, end) op de gevraagde resolutie.
+
+    Het venster wordt met een binaire zoektocht op de gesorteerde UTC-tijdas van de
+    `IntervalStore` gevonden, zodat de kosten meeschalen met de grootte van het
+    venster en niet met de hele historie. Daarna wordt alleen dat stuk per
+    integer-sleutel (uur, dag, week, maand) opgeteld.
+
+    Zonder `resolution` wordt die bij het venster gekozen (`auto_resolution`); een
+    expliciete resolutie die meer dan MAX_POINTS punten oplevert is een ValueError.
+    Geeft `(punten, resolutie)`.
+    """
+    if resolution is not None and resolution not in RESOLUTIONS:
+        raise ValueError(f"Onbekende resolutie '{resolution}', kies uit {', '.join(RESOLUTIONS)}")
+    if store.empty:
+        return [], resolution or AUTO_RESOLUTIONS[0]
+
+    lo = store.searchsorted(parse_timestamp(start).value) if start is not None else 0
+    hi = store.searchsorted(parse_timestamp(end).value) if end is not None else len(store)
+    window = store.slice(lo, hi)
+    if window.empty:
+        return [], resolution or AUTO_RESOLUTIONS[0]
+    if resolution is None:
+        resolution = auto_resolution(window)
+
+    cons = window.cons.astype('float64')
+    ret = window.ret.astype('float64')
+    starts = dates = None
+    if resolution != '15min':
+        dates = window.local_dates() if resolution != 'hour' else None
+        keys = _bucket_keys(window, resolution, dates)
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+
+    points = len(window) if starts is None else len(starts)
+    if points > MAX_POINTS:
+        raise ValueError(f"Venster levert {points} punten op (max {MAX_POINTS}); kies een grovere resolutie")
+
+    if starts is not None:
+        cons = np.add.reduceat(cons, starts)
+        ret = np.add.reduceat(ret, starts)
+    labels = _bucket_labels(window, resolution, starts, dates)
+    return [{
+        'timestamp': ts,
+        'verbruik': c,
+        'teruglevering': r
+    } for ts, c, r in zip(labels, np.round(cons, 3).tolist(), np.round(ret, 3).tolist())], resolution
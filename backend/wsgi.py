@@ -0,0 +1,24 @@
+"""WSGI-ingang voor productie: `gunicorn -c gunicorn.conf.py wsgi:application`.
+
+Met `preload_app` importeert de gunicorn-master dit bestand één keer vóór het
+forken. Prijzen, contracten en de geshapete meterdataset worden dan hier geladen
+en door alle workers copy-on-write gedeeld; een worker hoeft bij de start en bij
+de eerste request niets te parsen.
+"""
+import gc
+import logging
+
+from app import app, preload_datasets
+
+logger = logging.getLogger('gunicorn.error')
+
+loaded = preload_datasets()
+logger.info('Vooraf geladen: %s', ', '.join(loaded) or 'niets')
+
+# Alles wat nu leeft naar de permanente generatie: de garbage collector van de
+# workers schrijft dan niet meer in de headers van die objecten, waardoor hun
+# geheugenpagina's gedeeld blijven in plaats van per worker gekopieerd te worden
+gc.collect()
+gc.freeze()
+
+application = app